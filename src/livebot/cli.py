@@ -9,6 +9,11 @@ def parse_args() -> Namespace:
     parser.add_argument("--debug", action="store_true", help="run in debug mode")
     parser.add_argument("--without-tasks", action="store_true", help="run without tasks")
     parser.add_argument("--no-interactive", action="store_true", help="disable prompts")
+    parser.add_argument(
+        "--check-indexes",
+        action="store_true",
+        help="print difference between declared and existing database indexes and exit",
+    )
     parser.add_argument(
         "-v", "--version", action="version", version=str(VERSION), help="bot version"
     )
@@ -1,7 +1,7 @@
 from argparse import Namespace
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 import tomlkit
 from mashumaro.mixins.toml import DataClassTOMLMixin
@@ -14,17 +14,42 @@ class GeneralConfig:
     weather_region: str
     debug: bool = False
     owners: list[int] = field(default_factory=list)
+    stats_decay: Literal["batch", "pipeline", "lazy"] = "batch"
+
+
+@dataclass(kw_only=True)
+class DatabasePoolConfig:
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    server_selection_timeout_ms: int = 30_000
+    compressors: list[Literal["zstd", "snappy", "zlib"]] = field(default_factory=list)
+    read_concern: Optional[Literal["local", "available", "majority", "linearizable"]] = None
+    write_concern: Optional[int | str] = None
 
 
 @dataclass(kw_only=True)
 class DatabaseConfig:
     url: str
     name: str = "livebot"
+    pool: DatabasePoolConfig = field(default_factory=DatabasePoolConfig)
 
 
 @dataclass(kw_only=True)
 class RedisConfig:
     url: str
+    locks: bool = False
+    lock_timeout: float = 60
+
+
+@dataclass(kw_only=True)
+class RateLimitConfig:
+    global_rate: float = 30
+    chat_rate: float = 1
+    group_per_minute: int = 20
+    chat_burst: int = 3
+    concurrency: int = 8
+    max_retries: int = 5
 
 
 @dataclass(kw_only=True)
@@ -33,6 +58,7 @@ class TelegramConfig:
     log_chat_id: int | str
     channel_id: int
     log_thread_id: Optional[int] = None
+    rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
 
 
 @dataclass(kw_only=True)
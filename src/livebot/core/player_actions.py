@@ -14,6 +14,7 @@ from livebot.helpers.enums import WeatherCode
 from livebot.helpers.localization import t
 from livebot.helpers.markups import InlineMarkup
 from livebot.helpers.utils import pretty_int
+from livebot.tasks.notification import schedule_action
 
 
 async def walk_action(query: CallbackQuery, user: UserModel):
@@ -29,6 +30,7 @@ async def walk_action(query: CallbackQuery, user: UserModel):
 
         user.action = UserAction("walk", end=current_time + timedelta(hours=1))
         await user.update_async()
+        schedule_action(user)
     elif not user.is_current_action("walk"):
         await query.answer(t("busy_with_something_else"), show_alert=True)
         return
@@ -112,6 +114,7 @@ async def work_action(query: CallbackQuery, user: UserModel):
             + timedelta(hours=random.randint(2, 3), minutes=random.randint(10, 30)),
         )
         await user.update_async()
+        schedule_action(user)
     elif not user.is_current_action("work"):
         await query.answer(t("busy_with_something_else"), show_alert=True)
         return
@@ -155,6 +158,7 @@ async def sleep_action(query: CallbackQuery, user: UserModel):
             end=current_time + timedelta(hours=random.randint(6, 8)),
         )
         await user.update_async()
+        schedule_action(user)
     elif not user.is_current_action("sleep"):
         await query.answer(t("busy_with_something_else"), show_alert=True)
         return
@@ -201,6 +205,7 @@ async def game_action(query: CallbackQuery, user: UserModel):
             + timedelta(hours=random.randint(0, 3), minutes=random.randint(15, 20)),
         )
         await user.update_async()
+        schedule_action(user)
     elif not user.is_current_action("game"):
         await query.answer(t("busy_with_something_else"), show_alert=True)
         return
@@ -245,6 +250,7 @@ async def fishing_action(query: CallbackQuery, user: UserModel):
             end=current_time + timedelta(hours=random.randint(1, 4)),
         )
         await user.update_async()
+        schedule_action(user)
     elif not user.is_current_action("fishing"):
         await query.answer(t("busy_with_something_else"), show_alert=True)
         return
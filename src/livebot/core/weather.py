@@ -61,7 +61,7 @@ class Weather(DataClassDictMixin):
         return d
 
 
-@cached(expire=HOUR)
+@cached(expire=HOUR, stale_ttl=HOUR)
 async def _get_coords_for_region(name: str) -> tuple[float, float]:
     url = "https://geocoding-api.open-meteo.com/v1/search"
 
@@ -76,7 +76,7 @@ async def _get_coords_for_region(name: str) -> tuple[float, float]:
     return data["results"][0]["latitude"], data["results"][0]["longitude"]
 
 
-@cached(expire=HOUR)
+@cached(expire=HOUR, stale_ttl=HOUR, refresh="background")
 async def get_weather() -> Weather:
     coords = await _get_coords_for_region(config.general.weather_region)
     url = "https://api.open-meteo.com/v1/forecast"
@@ -1,16 +1,18 @@
+from typing import Final
+
 from livebot.data.achievements.achievements import ACHIEVEMENTS
 from livebot.datatypes import Achievement
-from livebot.helpers.cache import cached
 from livebot.helpers.exceptions import AchievementNotFoundError
+from livebot.helpers.registry import Registry
+
+
+ACHIEVEMENT_REGISTRY: Final = Registry(
+    ACHIEVEMENTS,
+    keys=lambda achievement: [achievement.name, achievement.translit(), achievement.key],
+    name=lambda achievement: achievement.name,
+    error=AchievementNotFoundError,
+)
 
 
-@cached()
 def get_achievement(name: str) -> Achievement:
-    for achievement in ACHIEVEMENTS:
-        if achievement.name == name:
-            return achievement
-        if name == achievement.translit():
-            return achievement
-        if name == achievement.key:
-            return achievement
-    raise AchievementNotFoundError(name)
+    return ACHIEVEMENT_REGISTRY.get(name)
@@ -1,11 +1,11 @@
 import random
-from typing import Optional, ParamSpec, TypeVar
+from typing import Final, Optional, ParamSpec, TypeVar
 
 from livebot.data.items.items import ITEMS
 from livebot.datatypes import Item
 from livebot.helpers.enums import ItemRarity
 from livebot.helpers.exceptions import ItemNotFoundError
-from livebot.helpers.utils import cached
+from livebot.helpers.registry import Registry
 
 
 P = ParamSpec("P")
@@ -20,19 +20,18 @@ RARITY_WEIGHTS = {
 }
 
 
-@cached()
+ITEM_REGISTRY: Final = Registry(
+    ITEMS,
+    keys=lambda item: [item.name, *(item.altnames or ()), item.translit()],
+    name=lambda item: item.name,
+    error=ItemNotFoundError,
+)
+
+
 def get_item(name: str) -> Item:
-    for item in ITEMS:
-        if item.name == name:
-            return item
-        if item.altnames and name in item.altnames:
-            return item
-        if item.translit() == name:
-            return item
-    raise ItemNotFoundError(name)
+    return ITEM_REGISTRY.get(name)
 
 
-@cached()
 def get_item_emoji(name: str) -> str:
     return get_item(name).emoji
 
@@ -54,7 +53,6 @@ def get_item_count_for_rarity(rarity: ItemRarity) -> int:
     return quantity
 
 
-@cached(storage="disk")
 def get_weights_for_items(items: list[Item]) -> list[int]:
     return [RARITY_WEIGHTS[item.rarity] for item in items]
 
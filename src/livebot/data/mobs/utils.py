@@ -1,21 +1,23 @@
 import random
-from typing import Optional
+from typing import Final, Optional
 
 from livebot.data.mobs.mobs import MOBS
 from livebot.database.models import UserModel
 from livebot.datatypes import Mob
-from livebot.helpers.cache import cached
 from livebot.helpers.exceptions import MobNotFoundError
+from livebot.helpers.registry import Registry
+
+
+MOB_REGISTRY: Final = Registry(
+    MOBS,
+    keys=lambda mob: [mob.name, mob.translit()],
+    name=lambda mob: mob.name,
+    error=MobNotFoundError,
+)
 
 
-@cached()
 def get_mob(name: str) -> Mob:
-    for mob in MOBS:
-        if mob.name == name:
-            return mob
-        if mob.translit() == name:
-            return mob
-    raise MobNotFoundError(name)
+    return MOB_REGISTRY.get(name)
 
 
 def get_random_mob(user: UserModel) -> Optional[Mob]:
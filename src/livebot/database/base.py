@@ -1,28 +1,178 @@
+import asyncio
+import traceback
+from copy import deepcopy
 from dataclasses import dataclass, field, fields
-from typing import Any, ClassVar, Required, Self, TypedDict
+from datetime import datetime
+from enum import Enum
+from functools import cache
+from inspect import isawaitable
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    ClassVar,
+    Mapping,
+    NotRequired,
+    Optional,
+    Required,
+    Self,
+    TypedDict,
+    TypeVar,
+    overload,
+)
 
 from bson import ObjectId
 from mashumaro import DataClassDictMixin, field_options
 from mashumaro.config import BaseConfig
 from mashumaro.types import Discriminator, SerializationStrategy
-from pymongo import AsyncMongoClient, MongoClient
+from pymongo import AsyncMongoClient, IndexModel, MongoClient, ReturnDocument, monitoring
 from pymongo.asynchronous.collection import AsyncCollection
 from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
 
 from livebot.cli import ARGS
-from livebot.config import config as app_config
+from livebot.config import config as app_config, logger
 from livebot.consts import EMPTY_OBJECTID
-from livebot.helpers.exceptions import AlreadyExists, NoResult
+from livebot.database.codec import LAZY_FIELDS, decode, decode_lazy_field
+from livebot.database.unit_of_work import current_unit_of_work
+from livebot.helpers.exceptions import AlreadyExists, NoResult, VersionConflict
 
 
-_client_options = {
-    "host": app_config.database.url,
-    "tz_aware": True,
-}
+class SyncCallDetector(monitoring.CommandListener):
+    """
+    Logs commands of the sync client that are sent while the event loop is running.
+    The sync API is only meant for tools and scripts.
+    """
 
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        stack = "".join(traceback.format_stack(limit=8)[:-1])
+        logger.warning(f"sync `{event.command_name}` called inside the event loop\n{stack}")
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+@dataclass
+class PoolStats:
+    connections: int = 0
+    checked_out: int = 0
+    max_checked_out: int = 0
+    checkouts: int = 0
+    checkout_failures: int = 0
+    checkout_wait: float = 0.0
+    clears: int = 0
+
+    @property
+    def average_checkout_wait(self) -> float:
+        return self.checkout_wait / self.checkouts if self.checkouts else 0.0
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.stats = PoolStats()
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(
+        self,
+        event: monitoring.PoolClearedEvent,  # noqa: ARG002
+    ) -> None:
+        self.stats.clears += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(
+        self,
+        event: monitoring.ConnectionCreatedEvent,  # noqa: ARG002
+    ) -> None:
+        self.stats.connections += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(
+        self,
+        event: monitoring.ConnectionClosedEvent,  # noqa: ARG002
+    ) -> None:
+        self.stats.connections -= 1
+
+    def connection_check_out_started(
+        self, event: monitoring.ConnectionCheckOutStartedEvent
+    ) -> None:
+        pass
+
+    def connection_check_out_failed(
+        self,
+        event: monitoring.ConnectionCheckOutFailedEvent,  # noqa: ARG002
+    ) -> None:
+        self.stats.checkout_failures += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        self.stats.checkouts += 1
+        self.stats.checked_out += 1
+        self.stats.max_checked_out = max(self.stats.max_checked_out, self.stats.checked_out)
+        self.stats.checkout_wait += event.duration or 0.0
+
+    def connection_checked_in(
+        self,
+        event: monitoring.ConnectionCheckedInEvent,  # noqa: ARG002
+    ) -> None:
+        self.stats.checked_out -= 1
+
+
+def _get_client_options() -> dict[str, Any]:
+    pool = app_config.database.pool
+    options: dict[str, Any] = {
+        "host": app_config.database.url,
+        "tz_aware": True,
+        "maxPoolSize": pool.max_pool_size,
+        "minPoolSize": pool.min_pool_size,
+        "maxIdleTimeMS": pool.max_idle_time_ms,
+        "serverSelectionTimeoutMS": pool.server_selection_timeout_ms,
+    }
+    if pool.compressors:
+        options["compressors"] = pool.compressors
+    if pool.read_concern:
+        options["readConcernLevel"] = pool.read_concern
+    if pool.write_concern is not None:
+        options["w"] = pool.write_concern
+    return options
+
+
+_client_options = _get_client_options()
+_sync_pool_listener = PoolStatsListener()
+_async_pool_listener = PoolStatsListener()
+
+
+sync_client = MongoClient(
+    **_client_options,
+    event_listeners=[
+        _sync_pool_listener,
+        *([SyncCallDetector()] if app_config.general.debug else []),
+    ],
+)
+async_client = AsyncMongoClient(**_client_options, event_listeners=[_async_pool_listener])
+
+
+def get_pool_stats() -> dict[str, PoolStats]:
+    return {
+        "sync": _sync_pool_listener.stats,
+        "async": _async_pool_listener.stats,
+    }
 
-sync_client = MongoClient(**_client_options)
-async_client = AsyncMongoClient(**_client_options)
 
 sync_db = sync_client.get_database(app_config.database.name)
 async_db = async_client.get_database(app_config.database.name)
@@ -36,6 +186,144 @@ if not ARGS.no_interactive and (app_config.general.debug and app_config.database
 
 class ModelSettings(TypedDict):
     collection_name: Required[str]
+    indexes: NotRequired[list[IndexModel]]
+    versioned: NotRequired[bool]
+    max_retries: NotRequired[int]
+
+
+@dataclass
+class IndexDrift:
+    missing: list[str] = field(default_factory=list)
+    extra: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.missing or self.extra or self.changed)
+
+
+def _index_spec(index: Mapping[str, Any]) -> tuple[tuple[tuple[str, Any], ...], bool]:
+    return tuple(index["key"].items()), bool(index.get("unique", False))
+
+
+def _diff(old: Any, new: Any, path: str, changes: dict[str, dict[str, Any]]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        if path and any("." in key or key.startswith("$") for key in new):
+            if old != new:
+                changes["$set"][path] = new
+            return
+
+        for key, value in new.items():
+            key_path = f"{path}.{key}" if path else key
+            if key not in old:
+                changes["$set"][key_path] = value
+            else:
+                _diff(old[key], value, key_path, changes)
+
+        for key in old.keys() - new.keys():
+            changes["$unset"][f"{path}.{key}" if path else key] = ""
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for i, (old_value, new_value) in enumerate(zip(old, new)):
+            _diff(old_value, new_value, f"{path}.{i}", changes)
+    elif old != new or type(old) is not type(new):
+        changes["$set"][path] = new
+
+
+def make_update(old: Optional[dict[str, Any]], new: dict[str, Any]) -> dict[str, Any]:
+    """
+    Build an update document that turns `old` into `new`, e.g.
+    `{"$set": {"inventory.items.3.quantity": 5}}`. Empty if nothing changed.
+    """
+    if old is None:
+        return {"$set": new}
+
+    changes: dict[str, dict[str, Any]] = {"$set": {}, "$unset": {}}
+    _diff(old, new, "", changes)
+    return {operator: values for operator, values in changes.items() if values}
+
+
+def _stored_fields(document: Mapping[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in document.items() if key not in ("_id", "_v")}
+
+
+def _overlaps(ours: dict[str, Any], theirs: dict[str, Any]) -> bool:
+    our_paths = {path for values in ours.values() for path in values}
+    their_paths = {path for values in theirs.values() for path in values}
+    return any(
+        a == b or a.startswith(f"{b}.") or b.startswith(f"{a}.")
+        for a in our_paths
+        for b in their_paths
+    )
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _get_path(document: Any, parts: list[str]) -> Any:
+    for part in parts:
+        document = document[int(part)] if isinstance(document, list) else document[part]
+    return document
+
+
+def _set_path(document: Any, parts: list[str], value: Any) -> bool:
+    try:
+        parent = _get_path(document, parts[:-1])
+        if isinstance(parent, list):
+            parent[int(parts[-1])] = value
+        else:
+            parent[parts[-1]] = value
+    except (KeyError, IndexError, TypeError, ValueError):
+        return False
+    return True
+
+
+def _rebase(
+    changes: dict[str, Any],
+    snapshot: dict[str, Any],
+    ours: dict[str, Any],
+    current: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    `current` with `changes` (made against `snapshot`) redone on top of it.
+    Changed numbers move by the same delta, other values are overwritten.
+    """
+    document = deepcopy(current)
+    for path, value in changes.get("$set", {}).items():
+        parts = path.split(".")
+        try:
+            old, now = _get_path(snapshot, parts), _get_path(document, parts)
+            if _is_number(value) and _is_number(old) and _is_number(now):
+                value = now + value - old
+        except (KeyError, IndexError, TypeError, ValueError):
+            pass
+        if not _set_path(document, parts, value):
+            document[parts[0]] = ours[parts[0]]
+    for path in changes.get("$unset", {}):
+        parts = path.split(".")
+        try:
+            del _get_path(document, parts[:-1])[parts[-1]]
+        except (KeyError, TypeError):
+            pass
+    return document
+
+
+def serialize_value(value: Any) -> Any:
+    # mirrors how mashumaro stores values, so raw update operators
+    # write the same shapes as `to_dict()`
+    if isinstance(value, DataClassDictMixin):
+        return value.to_dict()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {key: serialize_value(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [serialize_value(val) for val in value]
+    return value
 
 
 class ObjectIdSerializationStrategy(SerializationStrategy):
@@ -58,10 +346,68 @@ class SubModel(DataClassDictMixin):
             include_subtypes=True,
         )
 
+    if not TYPE_CHECKING:
+
+        def __getattr__(self, name: str) -> Any:
+            # fields marked as lazy are kept raw by the codec until first access
+            lazy = self.__dict__.get(LAZY_FIELDS)
+            if not lazy or name not in lazy:
+                raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+            value = decode_lazy_field(type(self), name, lazy.pop(name))
+            setattr(self, name, value)
+            return value
+
+
+@dataclass
+class ModelView(SubModel):
+    """
+    Typed subset of a model's fields. Loading a view only fetches the declared
+    fields, everything else is simply not there.
+    """
+
+    @classmethod
+    def get_projection(cls) -> dict[str, int]:
+        return _get_projection(cls)
+
+    @classmethod
+    def from_model(cls, model: "BaseModel") -> Self:
+        return cls(**{field_.name: getattr(model, field_.name) for field_ in fields(cls)})
+
+
+@cache
+def _get_projection(view: type[ModelView]) -> dict[str, int]:
+    return {field_.metadata.get("alias", field_.name): 1 for field_ in fields(view)}
+
+
+ViewT = TypeVar("ViewT", bound=ModelView)
+
+registered_models: list[type["BaseModel"]] = []
+
 
 @dataclass(kw_only=True)
 class BaseModel(SubModel):
     oid: ObjectId = field(default=EMPTY_OBJECTID, metadata=field_options(alias="_id"))
+    _snapshot: Optional[dict[str, Any]] = field(
+        default=None,
+        init=False,
+        repr=False,
+        compare=False,
+        metadata=field_options(serialize="omit"),
+    )
+    _version: int = field(
+        default=0,
+        init=False,
+        repr=False,
+        compare=False,
+        metadata=field_options(serialize="omit"),
+    )
+    _dirty: bool = field(
+        default=False,
+        init=False,
+        repr=False,
+        compare=False,
+        metadata=field_options(serialize="omit"),
+    )
 
     __settings__: ClassVar[ModelSettings]
     sync_collection: ClassVar[Collection]
@@ -71,6 +417,7 @@ class BaseModel(SubModel):
         if not cls.__name__.endswith("Model"):
             raise TypeError("Subclass name must end with 'Model'")
         cls._setup_model()
+        registered_models.append(cls)
         return super().__init_subclass__(**kwargs)
 
     def __post_init__(self):
@@ -79,6 +426,18 @@ class BaseModel(SubModel):
 
         self._setup_model()
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Tracks `_dirty`: set by writes to public fields, cleared whenever the
+        instance is in sync with the stored `_snapshot`. In-place changes of
+        nested values are only seen once `update_async` is called.
+        """
+        if name == "_snapshot":
+            object.__setattr__(self, "_dirty", False)
+        elif name[0] != "_":
+            object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, name, value)
+
     @classmethod
     def __post_deserialize__(cls, obj: Self):  # pyright: ignore
         if hasattr(obj, "__post_init__"):
@@ -92,6 +451,56 @@ class BaseModel(SubModel):
         if not hasattr(cls, "async_collection"):
             cls.async_collection = async_db.get_collection(cls.__settings__["collection_name"])
 
+    @classmethod
+    async def get_index_drift_async(cls) -> IndexDrift:
+        cls._setup_model()
+        declared = {
+            index.document["name"]: _index_spec(index.document)
+            for index in cls.__settings__.get("indexes", [])
+        }
+        existing = {
+            index["name"]: _index_spec(index)
+            async for index in await cls.async_collection.list_indexes()
+            if index["name"] != "_id_"
+        }
+
+        return IndexDrift(
+            missing=[name for name in declared if name not in existing],
+            extra=[name for name in existing if name not in declared],
+            changed=[
+                name
+                for name, spec in declared.items()
+                if name in existing and existing[name] != spec
+            ],
+        )
+
+    @classmethod
+    async def sync_indexes_async(cls) -> IndexDrift:
+        """
+        Create declared indexes that are missing and rebuild the ones whose
+        definition changed. Undeclared indexes are only reported.
+        """
+        drift = await cls.get_index_drift_async()
+        collection_name = cls.__settings__["collection_name"]
+
+        for name in drift.changed:
+            await cls.async_collection.drop_index(name)
+
+        for index in cls.__settings__.get("indexes", []):
+            name = index.document["name"]
+            if name not in drift.missing and name not in drift.changed:
+                continue
+            try:
+                await cls.async_collection.create_indexes([index])
+                logger.info(f"created index `{name}` on `{collection_name}`")
+            except OperationFailure as e:
+                logger.error(f"failed to create index `{name}` on `{collection_name}`: {e}")
+
+        for name in drift.extra:
+            logger.warning(f"index `{name}` on `{collection_name}` is not declared in the model")
+
+        return drift
+
     @classmethod
     def _handle_options(cls, options: dict[str, Any]) -> dict[str, Any]:
         if "oid" in options:
@@ -101,6 +510,38 @@ class BaseModel(SubModel):
                 options["_id"] = ObjectId(options["_id"])
         return options
 
+    @classmethod
+    def _from_document(cls, document: dict[str, Any], *, refresh: bool = False) -> Self:
+        """
+        Inside a unit of work an already loaded document resolves to the same
+        instance. With `refresh` that instance takes the state of `document`.
+        """
+        uow = current_unit_of_work.get()
+        if uow and (obj := uow.get(cls, document["_id"])):
+            if refresh:
+                obj._load(document)
+            return obj
+
+        obj = decode(cls, document)
+        obj._snapshot = _stored_fields(document)
+        obj._version = document.get("_v", 0)
+        if uow:
+            uow.add(obj)
+        return obj
+
+    def _load(self, document: dict[str, Any]) -> None:
+        loaded = decode(type(self), document)
+        for field_ in fields(self):
+            setattr(self, field_.name, getattr(loaded, field_.name))
+        self._snapshot = _stored_fields(document)
+        self._version = document.get("_v", 0)
+        self.__post_init__()
+
+    def _make_update(self) -> tuple[dict[str, Any], dict[str, Any]]:
+        dct = self.to_dict()
+        dct.pop("_id", None)
+        return make_update(self._snapshot, dct), dct
+
     def clone(self) -> Self:
         return self.__class__.from_dict(self.to_dict())
 
@@ -112,7 +553,7 @@ class BaseModel(SubModel):
 
         if not obj:
             raise NoResult
-        return cls.from_dict(obj)
+        return cls._from_document(obj)
 
     @classmethod
     def get_all(cls, **options) -> list[Self]:
@@ -122,16 +563,13 @@ class BaseModel(SubModel):
 
         if not objs:
             return []
-        return [cls.from_dict(obj) for obj in objs]
+        return [cls._from_document(obj) for obj in objs]
 
     @classmethod
     def check_exists(cls, **options) -> bool:
         cls._setup_model()
-        try:
-            cls.get(**options)
-            return True
-        except NoResult:
-            return False
+        options = cls._handle_options(options)
+        return cls.sync_collection.find_one(options, {"_id": 1}) is not None
 
     def add(self) -> None:
         if hasattr(self, "oid") and self.oid != EMPTY_OBJECTID:
@@ -140,12 +578,32 @@ class BaseModel(SubModel):
         del dct["_id"]
         result = self.sync_collection.insert_one(dct)
         self.oid = result.inserted_id
-        self.update()
+        dct.pop("_id", None)
+        self._snapshot = dct
 
     def update(self) -> None:
-        dct = self.to_dict()
-        dct.pop("_id", None)
-        self.sync_collection.update_one({"_id": self.oid}, {"$set": dct})
+        """
+        Versioned models only write if the stored `_v` still matches,
+        otherwise `VersionConflict` is raised.
+        """
+        changes, dct = self._make_update()
+        if not changes:
+            self._snapshot = dct
+            return
+        if not self.__settings__.get("versioned"):
+            self.sync_collection.update_one({"_id": self.oid}, changes)
+            self._snapshot = dct
+            return
+
+        version = self._version or {"$in": [0, None]}
+        result = self.sync_collection.update_one(
+            {"_id": self.oid, "_v": version},
+            {**changes, "$inc": {"_v": 1}},
+        )
+        if not result.matched_count:
+            raise VersionConflict(self.oid)
+        self._version += 1
+        self._snapshot = dct
 
     def delete(self) -> None:
         self.sync_collection.delete_one({"_id": self.oid})
@@ -155,13 +613,84 @@ class BaseModel(SubModel):
         for field_ in fields(self):
             setattr(self, field_.name, getattr(updated_instance, field_.name))
 
-    async def delete_async(self) -> None:
-        await self.async_collection.delete_one({"_id": self.oid})
-
-    async def update_async(self) -> None:
-        dct = self.to_dict()
-        dct.pop("_id", None)
-        await self.async_collection.update_one({"_id": self.oid}, {"$set": dct})
+    async def delete_async(self) -> bool:
+        if uow := current_unit_of_work.get():
+            uow.discard(self)
+        result = await self.async_collection.delete_one({"_id": self.oid})
+        return result.deleted_count > 0
+
+    async def update_async(self, reapply: Optional[Callable[[Self], Any]] = None) -> None:
+        """
+        Inside a unit of work the write is deferred until it exits,
+        so several updates of the same instance cost one round trip.
+        See `flush_async` for `reapply`.
+        """
+        self._dirty = True
+        if reapply is None and (uow := current_unit_of_work.get()) and uow.mark_dirty(self):
+            return
+        await self.flush_async(reapply)
+
+    async def flush_async(
+        self,
+        reapply: Optional[Callable[[Self], Any]] = None,
+        *,
+        merge: bool = False,
+    ) -> None:
+        """
+        Versioned models only write if the stored `_v` still matches. On a
+        conflict the changes are retried on top of the newer version when no
+        one else touched the same fields. Otherwise `reapply` is called on the
+        freshly loaded instance to redo the changes. With `merge` the changes
+        are rebased onto the newer version instead: changed numbers are
+        applied as increments, other fields overwrite the stored values.
+        Without either `VersionConflict` is raised.
+        """
+        changes, dct = self._make_update()
+        if not changes:
+            self._snapshot = dct
+            return
+        if not self.__settings__.get("versioned"):
+            await self.async_collection.update_one({"_id": self.oid}, changes)
+            self._snapshot = dct
+            return
+
+        for _ in range(self.__settings__.get("max_retries", 3) + 1):
+            version = self._version or {"$in": [0, None]}
+            result = await self.async_collection.update_one(
+                {"_id": self.oid, "_v": version},
+                {**changes, "$inc": {"_v": 1}},
+            )
+            if result.matched_count:
+                self._version += 1
+                self._snapshot = dct
+                return
+
+            current = await self.async_collection.find_one({"_id": self.oid})
+            if not current:
+                raise NoResult(self.oid)
+
+            if reapply:
+                self._load(current)
+                if isawaitable(reapplied := reapply(self)):
+                    await reapplied
+                changes, dct = self._make_update()
+                if not changes:
+                    return
+            elif merge:
+                stored = _stored_fields(current)
+                rebased = _rebase(changes, self._snapshot or {}, dct, stored)
+                self._load({"_id": self.oid, **rebased})
+                self._snapshot, self._version = stored, current.get("_v", 0)
+                self._dirty = True
+                changes, dct = self._make_update()
+                if not changes:
+                    return
+            elif _overlaps(changes, make_update(self._snapshot, _stored_fields(current))):
+                raise VersionConflict(self.oid)
+            else:
+                self._version = current.get("_v", 0)
+
+        raise VersionConflict(self.oid)
 
     async def add_async(self) -> None:
         if hasattr(self, "oid") and self.oid != EMPTY_OBJECTID:
@@ -170,40 +699,286 @@ class BaseModel(SubModel):
         del dct["_id"]
         result = await self.async_collection.insert_one(dct)
         self.oid = result.inserted_id
-        await self.update_async()
+        dct.pop("_id", None)
+        self._snapshot = dct
+        self._version = 0
+        if uow := current_unit_of_work.get():
+            uow.add(self)
 
     @classmethod
     async def check_exists_async(cls, **options) -> bool:
         cls._setup_model()
-        try:
-            await cls.get_async(**options)
-            return True
-        except NoResult:
-            return False
+        options = cls._handle_options(options)
+        return await cls.async_collection.find_one(options, {"_id": 1}) is not None
 
+    @overload
     @classmethod
-    async def get_all_async(cls, **options) -> list[Self]:
+    async def get_all_async(cls, *, projection: None = None, **options) -> list[Self]: ...
+
+    @overload
+    @classmethod
+    async def get_all_async(cls, *, projection: type[ViewT], **options) -> list[ViewT]: ...
+
+    @classmethod
+    async def get_all_async(
+        cls,
+        *,
+        projection: Optional[type[ModelView]] = None,
+        **options,
+    ) -> list[Any]:
         cls._setup_model()
         options = cls._handle_options(options)
-        objs = cls.async_collection.find(options)
+
+        objs = cls.async_collection.find(
+            options,
+            projection.get_projection() if projection else None,
+        )
         objs = await objs.to_list(length=None)
 
         if not objs:
             return []
+        if projection:
+            return [projection.from_dict(obj) for obj in objs]
+
+        return [cls._from_document(obj) for obj in objs]
+
+    @overload
+    @classmethod
+    def iter_async(
+        cls,
+        *,
+        batch_size: int = 100,
+        sort: Optional[list[tuple[str, int]]] = None,
+        projection: None = None,
+        **options,
+    ) -> AsyncIterator[Self]: ...
+
+    @overload
+    @classmethod
+    def iter_async(
+        cls,
+        *,
+        batch_size: int = 100,
+        sort: Optional[list[tuple[str, int]]] = None,
+        projection: type[ViewT],
+        **options,
+    ) -> AsyncIterator[ViewT]: ...
+
+    @classmethod
+    async def iter_async(
+        cls,
+        *,
+        batch_size: int = 100,
+        sort: Optional[list[tuple[str, int]]] = None,
+        projection: Optional[type[ModelView]] = None,
+        **options,
+    ) -> AsyncIterator[Any]:
+        """
+        Stream matching documents from the cursor, `batch_size` at a time,
+        instead of loading the whole result like `get_all_async` does.
+        """
+        cls._setup_model()
+        options = cls._handle_options(options)
+        cursor = cls.async_collection.find(
+            options,
+            projection.get_projection() if projection else None,
+            sort=sort,
+            batch_size=batch_size,
+        )
+
+        async for obj in cursor:
+            if projection:
+                yield projection.from_dict(obj)
+            else:
+                yield cls._from_document(obj)
 
-        return [cls.from_dict(obj) for obj in objs]
+    @overload
+    @classmethod
+    async def get_async(cls, *, projection: None = None, **options) -> Self: ...
 
+    @overload
     @classmethod
-    async def get_async(cls, **options) -> Self:
+    async def get_async(cls, *, projection: type[ViewT], **options) -> ViewT: ...
+
+    @classmethod
+    async def get_async(
+        cls,
+        *,
+        projection: Optional[type[ModelView]] = None,
+        **options,
+    ) -> Self | ModelView:
         cls._setup_model()
         options = cls._handle_options(options)
-        obj = await cls.async_collection.find_one(options)
+
+        uow = current_unit_of_work.get()
+        if uow and (mapped := uow.find(cls, options)):
+            return projection.from_model(mapped) if projection else mapped
+
+        obj = await cls.async_collection.find_one(
+            options,
+            projection.get_projection() if projection else None,
+        )
+
+        if not obj:
+            raise NoResult
+        if projection:
+            return projection.from_dict(obj)
+
+        model = cls._from_document(obj)
+        if uow:
+            uow.add(model, options)
+        return model
+
+    @classmethod
+    def _build_update(
+        cls,
+        *,
+        inc: Optional[dict[str, int | float]] = None,
+        set: Optional[dict[str, Any]] = None,
+        push: Optional[dict[str, Any]] = None,
+        pull: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        update: dict[str, Any] = {}
+        if inc:
+            update["$inc"] = inc
+        if set:
+            update["$set"] = serialize_value(set)
+        if push:
+            update["$push"] = serialize_value(push)
+        if pull:
+            update["$pull"] = serialize_value(pull)
+        if not update:
+            raise ValueError("Nothing to apply")
+        if cls.__settings__.get("versioned"):
+            update["$inc"] = {**update.get("$inc", {}), "_v": 1}
+        return update
+
+    @classmethod
+    async def apply_many_async(
+        cls,
+        *,
+        inc: Optional[dict[str, int | float]] = None,
+        set: Optional[dict[str, Any]] = None,
+        push: Optional[dict[str, Any]] = None,
+        pull: Optional[dict[str, Any]] = None,
+        **options,
+    ) -> int:
+        """
+        Same as `apply_async`, but for every matching document and without
+        reading them back. Returns the number of modified documents.
+        """
+        cls._setup_model()
+        query = cls._handle_options(options)
+
+        if uow := current_unit_of_work.get():
+            await uow.flush()
+
+        update = cls._build_update(inc=inc, set=set, push=push, pull=pull)
+        result = await cls.async_collection.update_many(query, update)
+        return result.modified_count
+
+    @classmethod
+    async def apply_pipeline_many_async(cls, pipeline: list[dict[str, Any]], **options) -> int:
+        """
+        Run an aggregation pipeline update on every matching document. Stages
+        are passed to mongodb as is, so values have to be stored shapes.
+        Returns the number of modified documents.
+        """
+        cls._setup_model()
+        query = cls._handle_options(options)
+
+        if uow := current_unit_of_work.get():
+            await uow.flush()
+
+        if cls.__settings__.get("versioned"):
+            pipeline = [*pipeline, {"$set": {"_v": {"$add": [{"$ifNull": ["$_v", 0]}, 1]}}}]
+        result = await cls.async_collection.update_many(query, pipeline)
+        return result.modified_count
+
+    @overload
+    @classmethod
+    async def apply_async(
+        cls,
+        *,
+        inc: Optional[dict[str, int | float]] = None,
+        set: Optional[dict[str, Any]] = None,
+        push: Optional[dict[str, Any]] = None,
+        pull: Optional[dict[str, Any]] = None,
+        guard: Optional[dict[str, Any]] = None,
+        projection: None = None,
+        **options,
+    ) -> Self: ...
+
+    @overload
+    @classmethod
+    async def apply_async(
+        cls,
+        *,
+        inc: Optional[dict[str, int | float]] = None,
+        set: Optional[dict[str, Any]] = None,
+        push: Optional[dict[str, Any]] = None,
+        pull: Optional[dict[str, Any]] = None,
+        guard: Optional[dict[str, Any]] = None,
+        projection: type[ViewT],
+        **options,
+    ) -> ViewT: ...
+
+    @classmethod
+    async def apply_async(
+        cls,
+        *,
+        inc: Optional[dict[str, int | float]] = None,
+        set: Optional[dict[str, Any]] = None,
+        push: Optional[dict[str, Any]] = None,
+        pull: Optional[dict[str, Any]] = None,
+        guard: Optional[dict[str, Any]] = None,
+        projection: Optional[type[ModelView]] = None,
+        **options,
+    ) -> Self | ModelView:
+        """
+        Atomically mutate one document on the server and return its new state.
+
+        `options` select the document like in `get_async`, `guard` adds extra
+        conditions (e.g. `{"coin": {"$gte": price}}`). Raises `NoResult` if
+        nothing matched, so a failed guard leaves the document untouched.
+        """
+        cls._setup_model()
+        query = cls._handle_options({**options, **(guard or {})})
+
+        if uow := current_unit_of_work.get():
+            await uow.flush()
+
+        update = cls._build_update(inc=inc, set=set, push=push, pull=pull)
+        obj = await cls.async_collection.find_one_and_update(
+            query,
+            update,
+            projection=projection.get_projection() if projection else None,
+            return_document=ReturnDocument.AFTER,
+        )
 
         if not obj:
             raise NoResult
-        return cls.from_dict(obj)
+        if projection:
+            if uow and (mapped := uow.get(cls, obj["_id"])):
+                uow.discard(mapped)
+            return projection.from_dict(obj)
+        return cls._from_document(obj, refresh=True)
 
     async def fetch_async(self) -> None:
-        updated_instance = await self.get_async(oid=self.oid)
-        for field_ in fields(self):
-            setattr(self, field_.name, getattr(updated_instance, field_.name))
+        obj = await self.async_collection.find_one({"_id": self.oid})
+
+        if not obj:
+            raise NoResult
+        self._load(obj)
+
+
+async def sync_indexes() -> None:
+    for model in registered_models:
+        await model.sync_indexes_async()
+
+
+async def get_index_drift() -> dict[str, IndexDrift]:
+    return {
+        model.__settings__["collection_name"]: await model.get_index_drift_async()
+        for model in registered_models
+    }
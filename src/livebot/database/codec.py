@@ -0,0 +1,211 @@
+from dataclasses import MISSING, Field, fields, is_dataclass
+from datetime import datetime
+from enum import Enum
+from types import NoneType, UnionType
+from typing import (
+    Any,
+    Callable,
+    Literal,
+    Mapping,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+from bson import ObjectId, decode as bson_decode
+from bson.raw_bson import RawBSONDocument
+from mashumaro.codecs.basic import BasicDecoder
+
+from livebot.config import logger
+
+
+LAZY_FIELDS = "_lazy_fields"
+
+Decoder = Callable[[Mapping[str, Any]], Any]
+
+_PASSTHROUGH_TYPES = (Any, int, float, str, bool)
+
+_decoders: dict[type, Optional[Decoder]] = {}
+_field_decoders: dict[tuple[type, str], Callable[[Any], Any]] = {}
+
+
+class UnsupportedType(Exception):
+    pass
+
+
+def _datetime(value: Any) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _object_id(value: Any) -> ObjectId:
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+def _literal(value: Any, allowed: frozenset[Any]) -> Any:
+    if value not in allowed:
+        raise ValueError(f"{value!r} is not one of {sorted(allowed)}")
+    return value
+
+
+class _Builder:
+    def __init__(self):
+        self.namespace: dict[str, Any] = {
+            "new": object.__new__,
+            "_datetime": _datetime,
+            "_object_id": _object_id,
+            "_literal": _literal,
+        }
+
+    def ref(self, value: Any) -> str:
+        name = f"_r{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def expr(self, tp: Any, var: str, depth: int = 0) -> str:
+        """
+        Python expression that decodes `var` stored as `tp`.
+        """
+        origin, args = get_origin(tp), get_args(tp)
+        item = f"x{depth}"
+
+        if tp in _PASSTHROUGH_TYPES:
+            return var
+        if tp is datetime:
+            return f"_datetime({var})"
+        if tp is ObjectId:
+            return f"_object_id({var})"
+        if isinstance(tp, type) and issubclass(tp, Enum):
+            return f"{self.ref(tp)}({var})"
+        if isinstance(tp, type) and is_dataclass(tp):
+            if tp.__subclasses__():
+                raise UnsupportedType(tp)
+            decoder = get_decoder(tp)
+            if decoder is None:
+                raise UnsupportedType(tp)
+            return f"{self.ref(decoder)}({var})"
+        if origin is Literal:
+            return f"_literal({var}, {self.ref(frozenset(args))})"
+        if origin in (Union, UnionType) and len(args) == 2 and NoneType in args:
+            (inner,) = (arg for arg in args if arg is not NoneType)
+            return f"(None if {var} is None else {self.expr(inner, var, depth)})"
+        if origin in (list, set):
+            inner = self.expr(args[0], item, depth + 1)
+            if inner == item:
+                return f"{origin.__name__}({var})"
+            brackets = "[]" if origin is list else "{}"
+            return f"{brackets[0]}{inner} for {item} in {var}{brackets[1]}"
+        if origin is dict and args[0] in (str, int):
+            inner = self.expr(args[1], item, depth + 1)
+            if inner == item:
+                return f"dict({var})"
+            return f"{{k{depth}: {inner} for k{depth}, {item} in {var}.items()}}"
+
+        raise UnsupportedType(tp)
+
+    def default(self, field_: Field) -> Optional[str]:
+        if field_.default is not MISSING:
+            return self.ref(field_.default)
+        if field_.default_factory is not MISSING:
+            return f"{self.ref(field_.default_factory)}()"
+        return None
+
+    def build(self, cls: type) -> Decoder:
+        hints = get_type_hints(cls)
+        lines = ["def decode(d):", "    obj = new(cls)", "    dct = obj.__dict__"]
+        self.namespace["cls"] = cls
+
+        lazy_fields = [
+            field_
+            for field_ in fields(cls)
+            if field_.init and field_.metadata.get("lazy") and field_.default is MISSING
+        ]
+        if lazy_fields:
+            lines.append(f"    lazy = dct[{LAZY_FIELDS!r}] = {{}}")
+
+        for field_ in fields(cls):
+            name = field_.name
+            default = self.default(field_)
+
+            if not field_.init:
+                if default is not None:
+                    lines.append(f"    dct[{name!r}] = {default}")
+                continue
+            if field_.metadata.get("deserialize") or field_.metadata.get("serialization_strategy"):
+                raise UnsupportedType(cls, name)
+
+            keys = list(dict.fromkeys([field_.metadata.get("alias", name), name]))
+            for i, key in enumerate(keys):
+                lines.append(f"    {'if' if i == 0 else 'elif'} {key!r} in d:")
+                if field_ in lazy_fields:
+                    lines.append(f"        lazy[{name!r}] = d[{key!r}]")
+                else:
+                    lines.append(f"        v = d[{key!r}]")
+                    lines.append(f"        dct[{name!r}] = {self.expr(hints[name], 'v')}")
+            lines.append("    else:")
+            if default is None:
+                lines.append(f"        raise KeyError({name!r})")
+            else:
+                lines.append(f"        dct[{name!r}] = {default}")
+
+            if field_ in lazy_fields:
+                _field_decoders[(cls, name)] = _Builder().build_field(hints[name])
+
+        for hook in ("__post_load__", "__post_init__"):
+            if hasattr(cls, hook):
+                lines.append(f"    obj.{hook}()")
+                break
+
+        lines.append("    return obj")
+        exec("\n".join(lines), self.namespace)  # pylint: disable=W0122
+        return self.namespace["decode"]
+
+    def build_field(self, tp: Any) -> Callable[[Any], Any]:
+        exec(f"def decode(v):\n    return {self.expr(tp, 'v')}", self.namespace)  # pylint: disable=W0122
+        decoder = self.namespace["decode"]
+        fallback = BasicDecoder(tp)
+
+        def decode(value: Any) -> Any:
+            try:
+                return decoder(value)
+            except Exception:  # pylint: disable=W0718
+                return fallback.decode(value)
+
+        return decode
+
+
+def get_decoder(cls: type) -> Optional[Decoder]:
+    """
+    Generated decoder for `cls`, or `None` if some of its field types are not
+    supported and `from_dict` has to be used instead.
+    """
+    if cls not in _decoders:
+        _decoders[cls] = None  # guards against recursive types
+        try:
+            _decoders[cls] = _Builder().build(cls)
+        except UnsupportedType as e:
+            logger.debug(f"no generated decoder for {cls.__name__}: unsupported {e.args}")
+    return _decoders[cls]
+
+
+def decode(cls: type[Any], document: Mapping[str, Any]) -> Any:
+    """
+    Build `cls` from a stored document (a `dict` or `RawBSONDocument`) without
+    going through the generic `from_dict`. Nested `__post_init__` hooks are
+    replaced by `__post_load__` where a class defines one, and fields marked
+    with `metadata={"lazy": True}` are decoded on first access.
+    """
+    if decoder := get_decoder(cls):
+        try:
+            return decoder(document)
+        except Exception as e:  # pylint: disable=W0718
+            logger.debug(f"generated decoder for {cls.__name__} failed: {e!r}")
+
+    if isinstance(document, RawBSONDocument):
+        document = bson_decode(document.raw)
+    return cls.from_dict(document)
+
+
+def decode_lazy_field(cls: type, name: str, value: Any) -> Any:
+    return _field_decoders[(cls, name)](value)
@@ -1,18 +1,20 @@
 import random
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import UTC, datetime, timedelta
 from typing import ClassVar, Literal, Optional
 
 from aiogram.types import InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from bson import ObjectId
 from mashumaro import field_options
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
-from livebot.config import bot
+from livebot.config import bot, config
+from livebot.consts import EMPTY_OBJECTID
 from livebot.data.achievements.utils import get_achievement
 from livebot.data.items.items import ITEMS
 from livebot.data.items.utils import get_item, get_item_count_for_rarity, get_item_emoji
-from livebot.database.base import BaseModel, SubModel
+from livebot.database.base import BaseModel, ModelView, SubModel
 from livebot.datatypes import Achievement, ChatIdType, UserActionType
 from livebot.helpers.datetime_utils import utcnow
 from livebot.helpers.enums import ItemRarity, ItemType, Locations
@@ -32,6 +34,25 @@ class CasinoInfo(SubModel):
         return self.win - self.loose
 
 
+STATS_DECAY_PERIOD = timedelta(hours=1)
+DECAY_STATS = ("hunger", "fatigue", "mood")
+# lazy decay applies at most a day, so `last_checked_at` left stale by other
+# modes doesn't drain players when `lazy` is enabled
+MAX_DECAY_PERIODS = 24
+_MASK64 = (1 << 64) - 1
+
+
+def _decay_choice(user_id: int, index: int) -> int:
+    """
+    Deterministic roll in `[0, 5]` for the decay period `index` of a user
+    (the splitmix64 finalizer).
+    """
+    x = (user_id * 0x9E3779B97F4A7C15 + index) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (x ^ (x >> 31)) % 6
+
+
 @dataclass
 class UserAction(SubModel):
     type: UserActionType
@@ -72,6 +93,13 @@ class UserItem(SubModel):
 
         self.name = get_item(self.name).name
 
+    def __post_load__(self):
+        """
+        Stored items were already validated by `__post_init__`, but older
+        documents may still keep an altname, so only the name is normalized.
+        """
+        self.name = get_item(self.name).name
+
     @property
     def type(self) -> ItemType:
         return get_item(self.name).type
@@ -99,26 +127,74 @@ class UserItem(SubModel):
             raise ValueError("Cannot use a stackable item")
 
 
+class _InventoryIndex:
+    __slots__ = ("by_id", "by_name", "items")
+
+    def __init__(self, items: list[UserItem]):
+        self.items = items
+        self.by_name: dict[str, list[UserItem]] = {}
+        self.by_id: dict[ObjectId, UserItem] = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item: UserItem):
+        self.by_name.setdefault(item.name, []).append(item)
+        self.by_id.setdefault(item.id, item)
+
+    def remove(self, item: UserItem):
+        entries = self.by_name[item.name]
+        for i, entry in enumerate(entries):
+            if entry is item:
+                del entries[i]
+                break
+        if not entries:
+            del self.by_name[item.name]
+        if self.by_id.get(item.id) is item:
+            del self.by_id[item.id]
+
+
 @dataclass
 class Inventory(SubModel):
-    items: list[UserItem] = field(default_factory=list)
+    """
+    Lookups go through an index by name and by id that is built on first use
+    and kept in sync by the methods below, so `items` must only be changed
+    through them or replaced as a whole.
+    """
+
+    items: list[UserItem] = field(default_factory=list, metadata={"lazy": True})
+
+    @property
+    def _index(self) -> _InventoryIndex:
+        index: Optional[_InventoryIndex] = self.__dict__.get("_inventory_index")
+        if index is None or index.items is not self.items:
+            index = self.__dict__["_inventory_index"] = _InventoryIndex(self.items)
+        return index
 
     def __pre_serialize__(self):
         self.items = [item for item in self.items if item.quantity > 0]
         return self
 
+    def _append(self, item: UserItem):
+        index = self._index
+        self.items.append(item)
+        index.add(item)
+
+    def _remove(self, item: UserItem):
+        index = self._index
+        self.items.remove(item)
+        index.remove(item)
+
     def add(self, name: str, count: int = 1, usage: float = 100.0):
         item = get_item(name)
 
         if item.type == ItemType.USABLE:
             for _ in range(count):
-                self.items.append(UserItem(name=item.name, quantity=1, usage=usage))
+                self._append(UserItem(name=item.name, quantity=1, usage=usage))
         elif item.type == ItemType.STACKABLE:
-            for inv_item in self.items:
-                if inv_item.name == name:
-                    inv_item.quantity += count
-                    return
-            self.items.append(UserItem(name=item.name, quantity=count))
+            if entries := self._index.by_name.get(item.name):
+                entries[0].quantity += count
+                return
+            self._append(UserItem(name=item.name, quantity=count))
 
     def remove(
         self,
@@ -126,56 +202,57 @@ class Inventory(SubModel):
         count: int = 1,
         id: Optional[ObjectId] = None,
     ) -> Optional[UserItem]:
-        for item in self.items:
-            if item.name == name and (id is None or item.id == id):
-                if item.type == ItemType.USABLE:
-                    return self.items.pop(self.items.index(item))
-                if item.type == ItemType.STACKABLE:
-                    item.quantity -= count
-                    if item.quantity <= 0:
-                        self.items.remove(item)
-                        return
-                    return item
+        if id is None:
+            entries = self._index.by_name.get(name)
+            item = entries[0] if entries else None
+        else:
+            item = self._index.by_id.get(id)
+        if item is None or item.name != name:
+            return None
+
+        if item.type == ItemType.USABLE:
+            self._remove(item)
+            return item
+        if item.type == ItemType.STACKABLE:
+            item.quantity -= count
+            if item.quantity <= 0:
+                self._remove(item)
+                return None
+            return item
+        return None
 
     # def add_and_get(self, name: str, count: int = 1, usage: float = 100.0) -> UserItem:
     #     self.add(name, count=count, usage=usage)
     #     return self.get(name)
 
     def get_all(self, name: str) -> list[UserItem]:
-        return [item for item in self.items if item.name == name and item.quantity > 0]
+        return [item for item in self._index.by_name.get(name, ()) if item.quantity > 0]
 
     def get_by_id(self, id: ObjectId | str) -> UserItem:
         id = ObjectId(id)
-        try:
-            return next(item for item in self.items if item.id == id and item.quantity > 0)
-        except IndexError as e:
-            raise NoResult(id) from e
+        item = self._index.by_id.get(id)
+        if item is None or item.quantity <= 0:
+            raise NoResult(id)
+        return item
 
     def get(self, name: str) -> UserItem:
-        items = self.get_all(name)
-
-        if not items:
-            raise NoResult(name)
-
-        try:
-            item = items[0]
-            if item.quantity <= 0:
-                raise NoResult(name)
-            return item
-        except IndexError as e:
-            raise NoResult(name) from e
+        for item in self._index.by_name.get(name, ()):
+            if item.quantity > 0:
+                return item
+        raise NoResult(name)
 
     def has(self, name: str) -> bool:
-        return len(self.get_all(name)) != 0
+        return any(item.quantity > 0 for item in self._index.by_name.get(name, ()))
 
     def use(self, name: str, amount: float):
-        for item in self.items:
-            if item.name == name and item.type == ItemType.USABLE:
-                assert item.usage  # for linters
-                item.usage = max(0.0, item.usage - amount)
-                if item.usage == 0.0:
-                    self.items.remove(item)
-                return
+        entries = self._index.by_name.get(name)
+        if not entries or entries[0].type != ItemType.USABLE:
+            return
+        item = entries[0]
+        assert item.usage  # for linters
+        item.usage = max(0.0, item.usage - amount)
+        if item.usage == 0.0:
+            self._remove(item)
 
 
 @dataclass
@@ -311,7 +388,16 @@ class UserQuest(SubModel):
 
 @dataclass
 class UserModel(BaseModel):
-    __settings__: ClassVar = {"collection_name": "users"}
+    __settings__: ClassVar = {
+        "collection_name": "users",
+        "indexes": [
+            IndexModel("id", unique=True),
+            IndexModel("last_checked_at"),
+            IndexModel("action.end"),
+            IndexModel("daily_gift.last_claimed_at"),
+        ],
+        "versioned": True,
+    }
     id: int
     name: str
     lang: str = "ru"
@@ -347,6 +433,30 @@ class UserModel(BaseModel):
         if not self.quest:
             self.new_quest()
         self.quest._user = self  # pylint: disable=W0212 # type: ignore
+        if config.general.stats_decay == "lazy":
+            self.apply_stats_decay()
+
+    def apply_stats_decay(self, now: Optional[datetime] = None):
+        """
+        Applies the decay of the periods passed since `last_checked_at`, at
+        most `MAX_DECAY_PERIODS` of them. Each period is rolled from a hash of
+        the user and the period, so the result doesn't depend on when or how
+        often it is computed.
+        """
+        period = STATS_DECAY_PERIOD.total_seconds()
+        end = int((now or utcnow()).timestamp() // period)
+        start = max(int(self.last_checked_at.timestamp() // period), end - MAX_DECAY_PERIODS)
+        if end <= start:
+            return
+
+        for index in range(start + 1, end + 1):
+            choice = _decay_choice(self.id, index)
+            if choice < len(DECAY_STATS) and (value := getattr(self, DECAY_STATS[choice])) > 0:
+                setattr(self, DECAY_STATS[choice], value - 1)
+            if not any(getattr(self, stat) > 0 for stat in DECAY_STATS):
+                break
+
+        self.last_checked_at = datetime.fromtimestamp(end * period, UTC)
 
     @property
     def tg_tag(self) -> str:
@@ -458,9 +568,41 @@ class UserModel(BaseModel):
             self.daily_gift.items[item.name] = get_item_count_for_rarity(item.rarity)
 
 
+@dataclass
+class UserRulesView(ModelView):
+    accepted_rules: bool = False
+
+
+@dataclass
+class UserAdminView(ModelView):
+    is_admin: bool = False
+
+
+@dataclass
+class UserIdView(ModelView):
+    id: int
+    oid: ObjectId = field(default=EMPTY_OBJECTID, metadata=field_options(alias="_id"))
+
+
+@dataclass
+class UserScheduleView(ModelView):
+    id: int
+    oid: ObjectId = field(default=EMPTY_OBJECTID, metadata=field_options(alias="_id"))
+    lang: str = "ru"
+    registered_at: datetime = field(default_factory=utcnow)
+    action: Optional[UserAction] = None
+    daily_gift: DailyGift = field(default_factory=DailyGift)
+    notification_status: UserNotificationStatus = field(default_factory=UserNotificationStatus)
+
+
 @dataclass
 class PromoModel(BaseModel):
-    __settings__: ClassVar = {"collection_name": "promos"}
+    __settings__: ClassVar = {
+        "collection_name": "promos",
+        "indexes": [
+            IndexModel("code", unique=True),
+        ],
+    }
 
     code: str
     items: dict[str, int]
@@ -474,7 +616,14 @@ class PromoModel(BaseModel):
 
 @dataclass
 class MarketItemModel(BaseModel):
-    __settings__: ClassVar = {"collection_name": "market_items"}
+    __settings__: ClassVar = {
+        "collection_name": "market_items",
+        "indexes": [
+            IndexModel("owner_oid"),
+            IndexModel([("name", ASCENDING), ("price", ASCENDING)]),
+            IndexModel([("published_at", DESCENDING)]),
+        ],
+    }
 
     name: str
     price: int
@@ -483,9 +632,8 @@ class MarketItemModel(BaseModel):
     usage: Optional[float] = None
     published_at: datetime = field(default_factory=utcnow)
 
-    @property
-    def owner(self) -> UserModel:
-        return UserModel.get(oid=self.owner_oid)
+    async def get_owner_async(self) -> UserModel:
+        return await UserModel.get_async(oid=self.owner_oid)
 
     @property
     def type(self) -> ItemType:
@@ -0,0 +1,87 @@
+from contextvars import ContextVar, Token
+from typing import TYPE_CHECKING, Any, Optional, Self, TypeVar
+
+from bson import ObjectId
+
+
+if TYPE_CHECKING:
+    from livebot.database.base import BaseModel
+
+
+ModelT = TypeVar("ModelT", bound="BaseModel")
+
+current_unit_of_work: ContextVar[Optional["UnitOfWork"]] = ContextVar(
+    "current_unit_of_work",
+    default=None,
+)
+
+
+class UnitOfWork:
+    """
+    Identity map for one incoming update.
+
+    While it is active every `get_async` of an already loaded document returns
+    the same instance, and `update_async` only marks the instance as dirty.
+    All dirty instances are written once, when the unit of work exits.
+    """
+
+    def __init__(self):
+        self.identity_map: dict[tuple[type["BaseModel"], ObjectId], "BaseModel"] = {}
+        self.lookups: dict[tuple[type["BaseModel"], Any], ObjectId] = {}
+        self.dirty: dict[tuple[type["BaseModel"], ObjectId], "BaseModel"] = {}
+        self._token: Optional[Token[Optional[UnitOfWork]]] = None
+
+    @staticmethod
+    def _lookup_key(model: type["BaseModel"], options: dict[str, Any]) -> Any:
+        key = (model, tuple(sorted(options.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, model: type[ModelT], oid: ObjectId) -> Optional[ModelT]:
+        return self.identity_map.get((model, oid))  # type: ignore
+
+    def find(self, model: type[ModelT], options: dict[str, Any]) -> Optional[ModelT]:
+        if options.keys() == {"_id"}:
+            return self.get(model, options["_id"])
+        if (key := self._lookup_key(model, options)) and (oid := self.lookups.get(key)):
+            return self.get(model, oid)
+        return None
+
+    def add(self, obj: "BaseModel", options: Optional[dict[str, Any]] = None) -> None:
+        self.identity_map.setdefault((type(obj), obj.oid), obj)
+        if options and (key := self._lookup_key(type(obj), options)):
+            self.lookups[key] = obj.oid
+
+    def discard(self, obj: "BaseModel") -> None:
+        self.identity_map.pop((type(obj), obj.oid), None)
+        self.dirty.pop((type(obj), obj.oid), None)
+
+    def mark_dirty(self, obj: "BaseModel") -> bool:
+        key = (type(obj), obj.oid)
+        if self.identity_map.get(key) is not obj:
+            return False
+        self.dirty[key] = obj
+        return True
+
+    async def flush(self) -> None:
+        """
+        Writes run after the handler already answered, so a concurrent write
+        to the same document is merged into ours instead of dropping it.
+        """
+        while self.dirty:
+            key = next(iter(self.dirty))
+            await self.dirty.pop(key).flush_async(merge=True)
+
+    async def __aenter__(self) -> Self:
+        self._token = current_unit_of_work.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self.flush()
+        finally:
+            assert self._token  # for linters
+            current_unit_of_work.reset(self._token)
@@ -2,10 +2,12 @@ from aiogram import Router
 from aiogram.filters import Command, CommandObject
 from aiogram.types import ChatPermissions, Message
 
+from livebot.database.base import get_pool_stats
 from livebot.database.models import UserModel, UserViolation
 from livebot.helpers.datetime_utils import utcnow
 from livebot.helpers.localization import t
-from livebot.helpers.utils import parse_time_duration
+from livebot.helpers.locks import user_lock
+from livebot.helpers.utils import parse_time_duration, pretty_float
 
 
 router = Router()
@@ -195,3 +197,28 @@ async def unban_cmd(message: Message):
     await message.chat.unban(reply_user.id)
 
     await message.reply(t("unban", user=reply_user))
+
+
+@router.message(Command("dbstats"))
+async def dbstats_cmd(message: Message):
+    user = await UserModel.get_async(id=message.from_user.id)
+
+    if not user.is_admin:
+        return
+
+    mess = "\n\n".join(
+        t(
+            "db-stats",
+            client=client,
+            stats=stats,
+            average_wait=pretty_float(stats.average_checkout_wait * 1000),
+        )
+        for client, stats in get_pool_stats().items()
+    )
+    mess += "\n\n" + t(
+        "lock-stats",
+        stats=user_lock.stats,
+        average_wait=pretty_float(user_lock.stats.average_wait * 1000),
+        max_wait=pretty_float(user_lock.stats.max_wait * 1000),
+    )
+    await message.reply(mess)
@@ -47,6 +47,7 @@ from livebot.helpers.player_utils import (
 )
 from livebot.helpers.stickers import Stickers
 from livebot.helpers.utils import batched, pretty_float, pretty_int
+from livebot.tasks.notification import schedule_action, schedule_daily_gift
 
 
 router = Router()
@@ -57,8 +58,6 @@ async def shop_callback(query: CallbackQuery, callback_data: ShopCallback):
     if callback_data.user_id != query.from_user.id:
         return
 
-    user = await UserModel.get_async(id=query.from_user.id)
-
     try:
         item = get_item(callback_data.item_name)
     except ItemNotFoundError as e:
@@ -69,14 +68,18 @@ async def shop_callback(query: CallbackQuery, callback_data: ShopCallback):
     quantity = callback_data.quantity
     price = item.price * quantity
 
-    if user.coin < price:
+    try:
+        user = await UserModel.apply_async(
+            id=query.from_user.id,
+            inc={"coin": -price},
+            guard={"coin": {"$gte": price}},
+        )
+    except NoResult:
         await query.answer(text=t("item-not-enough", item_name="бабло"), show_alert=True)
         return
 
     user.inventory.add(item.name, quantity)
 
-    user.coin -= price
-
     assert isinstance(query.message, Message)
 
     await query.message.reply_to_message.reply(
@@ -235,6 +238,9 @@ async def use_callback(query: CallbackQuery, callback_data: UseCallback):
     await user.check_status(chat_id=query.message.chat.id)
     await user.update_async()
 
+    if item.name == "велик":
+        schedule_action(user)
+
     items = get_available_items_for_use(user)
 
     if items:  # pylint: disable=duplicate-code
@@ -341,14 +347,19 @@ async def trader_callback(query: CallbackQuery, callback_data: TraderCallback):
 
     item = get_item(callback_data.item_name)
 
-    if user.coin < callback_data.price:
+    try:
+        user = await UserModel.apply_async(
+            oid=user.oid,
+            inc={"coin": -callback_data.price},
+            guard={"coin": {"$gte": callback_data.price}},
+        )
+    except NoResult:
         await query.answer(
             t("item-not-enough", item_name="бабло"),
             show_alert=True,
         )
         return
 
-    user.coin -= callback_data.price
     user.inventory.add(item.name, callback_data.quantity)
     await user.update_async()
     await query.message.delete()
@@ -480,6 +491,7 @@ async def daily_gift_callback(query: CallbackQuery, callback_data: DailyGiftCall
 
     user.notification_status.daily_gift = False
     await user.update_async()
+    schedule_daily_gift(user)
 
     mess = t("daily-gift.claim", user=user, items=items)
 
@@ -504,11 +516,13 @@ async def market_callback(
         case "view":
             assert callback_data.current_page is not None  # for linters
             item = await MarketItemModel.get_async(oid=callback_data.item_oid)
+            owner = await item.get_owner_async()
 
             await query.message.edit_text(
                 t(
                     "market.item-info",
                     item=item,
+                    owner=owner,
                 ),
                 reply_markup=InlineMarkup.market_item_view(callback_data.current_page, item, user),
             )
@@ -519,19 +533,30 @@ async def market_callback(
             max_page = len(list(batched(items, MARKET_ITEMS_LIST_MAX_ITEMS_COUNT)))
             await query.message.edit_text(
                 t("market.main", current_page=page + 1, max_page=max_page),
-                reply_markup=InlineMarkup.market_main(page, user),
+                reply_markup=InlineMarkup.market_main(page, user, items),
             )
         case "buy":
             item = await MarketItemModel.get_async(oid=callback_data.item_oid)
 
-            if item.owner == user.oid:
+            if item.owner_oid == user.oid:
                 return  # TODO: Add message
 
-            if user.coin < item.price:
+            try:
+                user = await UserModel.apply_async(
+                    oid=user.oid,
+                    inc={"coin": -item.price},
+                    guard={"coin": {"$gte": item.price}},
+                )
+            except NoResult:
                 await query.answer(t("item-not-enough", item_name="бабло"))
                 return
 
-            user.coin -= item.price
+            if not await item.delete_async():
+                # someone else bought it first
+                await UserModel.apply_async(oid=user.oid, inc={"coin": item.price})
+                await query.answer(t("market.item-already-sold"), show_alert=True)
+                return
+
             usage_text = ""
             if item.usage:
                 usage_text = f"({pretty_float(item.usage)}%)"
@@ -539,7 +564,6 @@ async def market_callback(
             else:
                 user.inventory.add(item.name, item.quantity)
 
-            await item.delete_async()
             await user.update_async()
 
             assert callback_data.current_page is not None  # for linters
@@ -548,13 +572,14 @@ async def market_callback(
             max_page = len(list(batched(items, MARKET_ITEMS_LIST_MAX_ITEMS_COUNT)))
             await query.message.edit_text(
                 t("market.main", current_page=page + 1, max_page=max_page),
-                reply_markup=InlineMarkup.market_main(page, user),
+                reply_markup=InlineMarkup.market_main(page, user, items),
             )
 
             await query.message.answer(t("market.buy-item", user=user, usage=usage_text, item=item))
+            owner = await item.get_owner_async()
             await query.bot.send_message(
-                item.owner.id,
-                t("market.sold-item", user=user, usage=usage_text, item=item),
+                owner.id,
+                t("market.sold-item", locale=owner.lang, user=user, usage=usage_text, item=item),
             )
         case "back" | "next":
             assert callback_data.current_page is not None
@@ -571,7 +596,7 @@ async def market_callback(
             with suppress(TelegramBadRequest):
                 await query.message.edit_text(
                     t("market.main", current_page=page + 1, max_page=max_page),
-                    reply_markup=InlineMarkup.market_main(page, user),
+                    reply_markup=InlineMarkup.market_main(page, user, items),
                 )
         case "kiosk":
             assert callback_data.current_page is not None
@@ -596,13 +621,15 @@ async def market_callback(
 
             await query.answer(t("market.item-removed", item=item), show_alert=True)
 
+            market_items = await MarketItemModel.get_all_async(owner_oid=str(user.oid))
             await query.message.edit_reply_markup(
-                reply_markup=InlineMarkup.market_my_items(user),
+                reply_markup=InlineMarkup.market_my_items(user, market_items),
             )
         case "my-items":
+            market_items = await MarketItemModel.get_all_async(owner_oid=str(user.oid))
             await query.message.edit_text(
                 t("market.my-items"),
-                reply_markup=InlineMarkup.market_my_items(user),
+                reply_markup=InlineMarkup.market_my_items(user, market_items),
             )
 
 
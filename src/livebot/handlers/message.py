@@ -7,7 +7,7 @@ from aiogram.types import Message
 
 from livebot.consts import MARKET_ITEMS_LIST_MAX_ITEMS_COUNT, TELEGRAM_ID
 from livebot.core.weather import get_weather
-from livebot.data.items.utils import get_item, get_item_emoji
+from livebot.data.items.utils import ITEM_REGISTRY, get_item, get_item_emoji
 from livebot.database.models import MarketItemModel, PromoModel, UserModel
 from livebot.helpers.datetime_utils import utcnow
 from livebot.helpers.enums import ItemType
@@ -37,6 +37,14 @@ from livebot.middlewares.register import register_user
 router = Router()
 
 
+def item_not_exist_message(item_name: str) -> str:
+    mess = t("item-not-exist", item_name=item_name)
+    if suggestions := ITEM_REGISTRY.suggest(item_name):
+        names = ", ".join(f"<code>{name}</code>" for name in suggestions)
+        mess += "\n" + t("item-suggestions", suggestions=names)
+    return mess
+
+
 @router.message(CommandStart())
 @router.message(CommandStart(deep_link=True))
 async def start_cmd(message: Message, command: CommandObject):
@@ -56,7 +64,7 @@ async def start_cmd(message: Message, command: CommandObject):
             await from_user.update_async()
 
             user = await register_user(message)
-            mess = t("new_referral_joined", name=user.name, coin=coin)
+            mess = t("new_referral_joined", locale=from_user.lang, name=user.name, coin=coin)
 
             await message.bot.send_message(from_user.id, mess)
 
@@ -147,15 +155,41 @@ async def casino_cmd(message: Message, command: CommandObject):
 
     await asyncio.sleep(2)
 
-    ticket.quantity -= 1
+    guard = {"inventory.items": {"$elemMatch": {"name": ticket.name, "quantity": {"$gte": 1}}}}
+    is_win = is_win_in_slot_machine(dice.dice.value)
+
+    try:
+        if is_win:
+            user = await UserModel.apply_async(
+                oid=user.oid,
+                inc={
+                    "coin": quantity * 2,
+                    "casino_info.win": quantity * 2,
+                    "inventory.items.$.quantity": -1,
+                },
+                guard=guard,
+            )
+        else:
+            user = await UserModel.apply_async(
+                oid=user.oid,
+                inc={
+                    "coin": -quantity,
+                    "casino_info.loose": quantity,
+                    "inventory.items.$.quantity": -1,
+                },
+                guard={**guard, "coin": {"$gte": quantity}},
+            )
+    except NoResult:
+        # the ticket or the coins were spent meanwhile, tell which one
+        if not await UserModel.check_exists_async(oid=user.oid, **guard):
+            await message.reply(t("item-not-found-in-inventory", item_name=ticket.name))
+        else:
+            await message.reply(t("item-not-enough", item_name="бабло"))
+        return
 
-    if is_win_in_slot_machine(dice.dice.value):
-        user.coin += quantity * 2
-        user.casino_info.win += quantity * 2
+    if is_win:
         await message.reply(t("casino.win", quantity=quantity * 2))
     else:
-        user.coin -= quantity
-        user.casino_info.loose += quantity
         await message.reply(t("casino.loose", quantity=quantity))
 
     await user.check_status(message.chat.id)
@@ -194,7 +228,7 @@ async def transfer_cmd(message: Message, command: CommandObject):
     try:
         item = get_item(item_name)
     except ItemNotFoundError:
-        await message.reply(t("item-not-exist", item_name=item_name))
+        await message.reply(item_not_exist_message(item_name))
         return
 
     try:
@@ -214,11 +248,16 @@ async def transfer_cmd(message: Message, command: CommandObject):
     target_user = await UserModel.get_async(id=message.reply_to_message.from_user.id)
 
     if item.name == "бабло":
-        if user.coin < quantity:
+        try:
+            user = await UserModel.apply_async(
+                oid=user.oid,
+                inc={"coin": -quantity},
+                guard={"coin": {"$gte": quantity}},
+            )
+        except NoResult:
             await message.reply(t("item-not-enough", item_name="бабло"))
             return
-        user.coin -= quantity
-        target_user.coin += quantity
+        target_user = await UserModel.apply_async(oid=target_user.oid, inc={"coin": quantity})
         mess = t(
             "transfer.success",
             from_user=user,
@@ -356,10 +395,10 @@ async def price_cmd(message: Message, command: CommandObject):
     try:
         item = get_item(item_name)
     except ItemNotFoundError:
-        await message.reply(t("item-not-exist", item_name=item_name))
+        await message.reply(item_not_exist_message(item_name))
         return
 
-    price = get_item_middle_price(item.name)
+    price = await get_item_middle_price(item.name)
 
     if price:
         mess = t("price.price", item=item, price=price)
@@ -448,5 +487,5 @@ async def market_cmd(message: Message):
     max_page = len(list(batched(items, MARKET_ITEMS_LIST_MAX_ITEMS_COUNT)))
     await message.reply(
         t("market.main", current_page=page + 1, max_page=max_page),
-        reply_markup=InlineMarkup.market_main(page, user),
+        reply_markup=InlineMarkup.market_main(page, user, items),
     )
@@ -61,7 +61,7 @@ class AddMarketItemSelectPriceScene(
         assert item_oid is not None  # for lintes
 
         user_item = user.inventory.get_by_id(item_oid)
-        price = get_item_middle_price(user_item.name)
+        price = await get_item_middle_price(user_item.name)
 
         if price:
             key = "input-price__with_middle_price"
@@ -1,22 +1,41 @@
+import asyncio
 import hashlib
 import pickle
+import sqlite3
+import threading
 import time
-from functools import wraps
+from contextlib import suppress
+from contextvars import Context
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial, wraps
 from inspect import iscoroutinefunction
 from pathlib import Path
-from typing import Any, Awaitable, Callable, Literal, Optional, ParamSpec, TypeVar
+from typing import Any, Awaitable, Callable, Hashable, Literal, Optional, ParamSpec, TypeVar
 
 from cachetools import LRUCache
 
-from livebot.consts import CACHE_DIR
+from livebot.consts import CACHE_DIR, EMPTY_OBJECTID
+from livebot.helpers.datetime_utils import utcnow
+from livebot.helpers.scheduler import Scheduler
 
 
 P = ParamSpec("P")
 T = TypeVar("T")
 
 
+def _model_key(obj: Any) -> Any:
+    # a stored versioned model without unsaved changes is identified by its
+    # id and stored version, anything else by its content
+    if obj.oid != EMPTY_OBJECTID and obj.__settings__.get("versioned") and not obj._dirty:  # pylint: disable=W0212
+        return (type(obj).__qualname__, str(obj.oid), obj._version)  # pylint: disable=W0212
+    return obj.to_dict()
+
+
 def make_hash(*args: Any) -> str:
     def convert(obj: Any) -> Any:
+        if hasattr(obj, "oid") and hasattr(obj, "_version"):
+            return _model_key(obj)
         if hasattr(obj, "to_dict"):
             return obj.to_dict()
         if isinstance(obj, dict):
@@ -30,115 +49,319 @@ def make_hash(*args: Any) -> str:
     return hashlib.md5(key).hexdigest()
 
 
+_KWARGS: Any = object()  # separates positional and keyword arguments in keys
+
+
+def make_key(name: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Hashable:
+    """
+    Key for the ram cache: `name` alone for a call without arguments, a plain
+    tuple when all arguments are hashable and `make_hash` otherwise. Argument
+    types are part of the key, since `1`, `1.0` and `True` are equal.
+    """
+    if not args and not kwargs:
+        return name
+    if kwargs:
+        values = (*args, *kwargs.values())
+        key = (name, *args, _KWARGS, *kwargs.items(), *map(type, values))
+    else:
+        key = (name, *args, *map(type, args))
+    try:
+        hash(key)
+    except TypeError:
+        return make_hash(name, *args, kwargs)
+    return key
+
+
 class DiskCache:
+    """
+    Pickled values in a sqlite database in WAL mode.
+
+    Every write is one transaction, so an entry is never half written, and
+    with `synchronous=NORMAL` fsync happens only on WAL checkpoints instead
+    of on every write. The oldest entries are evicted through an index on
+    the store time. Async callers use the `*_async` methods, which run in a
+    worker thread.
+    """
+
     def __init__(self, path: Path, max_items: int = 2048):
         self.path = path
         self.path.mkdir(exist_ok=True)
-        self.index_file = self.path / "index.pkl"
-        self.index = self._load_index()
         self.max_items = max_items
-
-    def _load_index(self) -> dict[str, float]:
-        if self.index_file.exists():
-            with open(self.index_file, "rb") as f:
-                return pickle.load(f)
-        return {}
-
-    def _save_index(self) -> None:
-        with open(self.index_file, "wb") as f:
-            pickle.dump(self.index, f)
-
-    def _item_path(self, key: str) -> Path:
-        return self.path / f"{key}.pkl"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path / "cache.sqlite3",
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at);
+            """
+        )
+        self._count: int = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        self._remove_legacy_files()
+
+    def _remove_legacy_files(self) -> None:
+        # the previous implementation kept one pickle per key and an index of them
+        index_file = self.path / "index.pkl"
+        if not index_file.exists():
+            return
+        with suppress(OSError, pickle.UnpicklingError, EOFError), open(index_file, "rb") as f:
+            for key in pickle.load(f):
+                (self.path / f"{key}.pkl").unlink(missing_ok=True)
+        index_file.unlink(missing_ok=True)
 
     def get(self, key: str, expire: Optional[int]) -> Optional[Any]:
-        if key not in self.index:
+        entry = self.get_entry(key)
+        if entry is None:
             return None
-        now = time.time()
-        if expire is not None and now - self.index[key] > expire:
+        value, stored_at = entry
+        if expire is not None and time.time() - stored_at > expire:
             self.delete(key)
             return None
-        item_path = self._item_path(key)
-        if not item_path.exists():
+        return value
+
+    def get_entry(self, key: str) -> Optional[tuple[Any, float]]:
+        """
+        Value with the time it was stored, regardless of its age.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
             return None
-        with open(item_path, "rb") as f:
-            return pickle.load(f)
+        return pickle.loads(row[0]), row[1]
 
     def set(self, key: str, value: Any) -> None:
-        if len(self.index) >= self.max_items:
-            oldest_key = min(self.index.items(), key=lambda x: x[1])[0]
-            self.delete(oldest_key)
-        item_path = self._item_path(key)
-        with open(item_path, "wb") as f:
-            pickle.dump(value, f)
-        self.index[key] = time.time()
-        self._save_index()
+        data = pickle.dumps(value)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                exists = self._db.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, data, time.time()),
+                )
+                if not exists:
+                    self._count += 1
+                if self._count > self.max_items:
+                    self._count -= self._db.execute(
+                        "DELETE FROM cache WHERE key IN "
+                        "(SELECT key FROM cache ORDER BY stored_at LIMIT ?)",
+                        (self._count - self.max_items,),
+                    ).rowcount
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
 
     def delete(self, key: str) -> None:
-        self.index.pop(key, None)
-        path = self._item_path(key)
-        if path.exists():
-            path.unlink()
-        self._save_index()
+        with self._lock:
+            self._count -= self._db.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+
+    async def get_entry_async(self, key: str) -> Optional[tuple[Any, float]]:
+        return await asyncio.to_thread(self.get_entry, key)
 
+    async def set_async(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self.set, key, value)
 
-ram_cache: LRUCache[str, tuple[Any, float]] = LRUCache(4048 * 2)
+
+ram_cache: LRUCache[Hashable, tuple[Any, float]] = LRUCache(4048 * 2)
 disk_cache = DiskCache(CACHE_DIR)
 
+_MISSING: Any = object()
+_in_flight: dict[Hashable, asyncio.Task[Any]] = {}
 
-async def _async_wrapper(
+REFRESH_AHEAD = 0.9
+
+
+@dataclass(frozen=True)
+class _Options:
+    expire: Optional[int]
+    storage: Literal["ram", "disk"]
+    single_flight: bool
+    timeout: Optional[float]
+    stale_ttl: Optional[int]
+    refresh: Optional[Literal["background"]]
+
+
+@dataclass
+class _RefreshEntry:
+    func: Callable[..., Awaitable[Any]]
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    options: _Options
+    last_read: float
+
+
+_refresh_entries: dict[Hashable, _RefreshEntry] = {}
+_refresher: Scheduler[Hashable] = Scheduler()
+_refresher_task: Optional[asyncio.Task[None]] = None
+
+
+def _lookup(key: Hashable, storage: Literal["ram", "disk"]) -> tuple[Any, float]:
+    if storage == "ram":
+        try:
+            return ram_cache[key]
+        except KeyError:
+            pass
+    elif storage == "disk":
+        entry = disk_cache.get_entry(str(key))
+        if entry is not None:
+            return entry
+    return _MISSING, 0.0
+
+
+def _set(key: Hashable, value: Any, storage: Literal["ram", "disk"], timestamp: float) -> None:
+    if storage == "ram":
+        ram_cache[key] = (value, timestamp)
+    elif storage == "disk":
+        disk_cache.set(str(key), value)
+
+
+async def _lookup_async(key: Hashable, storage: Literal["ram", "disk"]) -> tuple[Any, float]:
+    if storage == "disk":
+        entry = await disk_cache.get_entry_async(str(key))
+        return (_MISSING, 0.0) if entry is None else entry
+    return _lookup(key, storage)
+
+
+async def _set_async(
+    key: Hashable,
+    value: Any,
+    storage: Literal["ram", "disk"],
+    timestamp: float,
+) -> None:
+    if storage == "disk":
+        await disk_cache.set_async(str(key), value)
+    else:
+        _set(key, value, storage, timestamp)
+
+
+async def _compute(
     func: Callable[P, Awaitable[T]],
-    key: str,
-    expire: Optional[int],
+    key: Hashable,
     storage: Literal["ram", "disk"],
     *args: P.args,
     **kwargs: P.kwargs,
 ) -> T:
     now = time.time()
-
-    if storage == "ram":
-        if key in ram_cache:
-            val, timestamp = ram_cache[key]
-            if expire is None or now - timestamp < expire:
-                return val
-    elif storage == "disk":
-        cached = disk_cache.get(key, expire)
-        if cached is not None:
-            return cached
-
     result = await func(*args, **kwargs)
-    if storage == "ram":
-        ram_cache[key] = (result, now)
-    elif storage == "disk":
-        disk_cache.set(key, result)
+    await _set_async(key, result, storage, now)
     return result
 
 
-def _sync_wrapper(
-    func: Callable[P, T],
-    key: str,
-    expire: Optional[int],
+def _start(
+    func: Callable[P, Awaitable[T]],
+    key: Hashable,
     storage: Literal["ram", "disk"],
     *args: P.args,
     **kwargs: P.kwargs,
+) -> asyncio.Task[T]:
+    task = _in_flight.get(key)
+    if task is None:
+        # the result is shared by all callers, so it's computed outside any one's context
+        task = _in_flight[key] = asyncio.create_task(
+            _compute(func, key, storage, *args, **kwargs),
+            context=Context(),
+        )
+        task.add_done_callback(partial(_finish, key))
+    return task
+
+
+def _finish(key: Hashable, task: asyncio.Task[Any]) -> None:
+    if _in_flight.get(key) is task:
+        del _in_flight[key]
+    if not task.cancelled():
+        task.exception()  # marks the error as retrieved when nobody waits anymore
+
+
+def _schedule_refresh(key: Hashable, expire: int) -> None:
+    global _refresher_task  # pylint: disable=W0603
+    _refresher.schedule(key, utcnow() + timedelta(seconds=expire * REFRESH_AHEAD))
+    if _refresher_task is None or _refresher_task.done():
+        # refreshes run for every caller, not inside the first one's unit of work or locale
+        _refresher_task = asyncio.create_task(_refresher.run(_refresh), context=Context())
+
+
+def _track(
+    key: Hashable, func: Callable[..., Awaitable[Any]], args, kwargs, options: _Options
+) -> None:
+    if entry := _refresh_entries.get(key):
+        entry.last_read = time.time()
+        return
+    assert options.expire  # for linters
+    _refresh_entries[key] = _RefreshEntry(func, args, kwargs, options, time.time())
+    _schedule_refresh(key, options.expire)
+
+
+async def _refresh(key: Hashable, _payload: Any) -> None:
+    entry = _refresh_entries[key]
+    expire = entry.options.expire
+    assert expire  # for linters
+    if time.time() - entry.last_read > expire:
+        # nobody asked for it during the whole period
+        del _refresh_entries[key]
+        return
+
+    try:
+        await _start(entry.func, key, entry.options.storage, *entry.args, **entry.kwargs)
+    finally:
+        _schedule_refresh(key, expire)
+
+
+async def _async_wrapper(
+    func: Callable[P, Awaitable[T]],
+    key: Hashable,
+    options: _Options,
+    *args: P.args,
+    **kwargs: P.kwargs,
 ) -> T:
-    now = time.time()
+    if options.refresh == "background":
+        _track(key, func, args, kwargs, options)
 
-    if storage == "ram":
-        if key in ram_cache:
-            val, timestamp = ram_cache[key]
-            if expire is None or now - timestamp < expire:
-                return val
-    elif storage == "disk":
-        cached = disk_cache.get(key, expire)
-        if cached is not None:
-            return cached
+    val, timestamp = await _lookup_async(key, options.storage)
+    if val is not _MISSING:
+        age = time.time() - timestamp
+        if options.expire is None or age < options.expire:
+            return val
+        if options.stale_ttl and age < options.expire + options.stale_ttl:
+            _start(func, key, options.storage, *args, **kwargs)
+            return val
+
+    if not options.single_flight:
+        return await asyncio.wait_for(
+            _compute(func, key, options.storage, *args, **kwargs), options.timeout
+        )
+
+    # concurrent callers share one task; shield keeps a timed out or
+    # cancelled caller from cancelling it for the others
+    task = _start(func, key, options.storage, *args, **kwargs)
+    return await asyncio.wait_for(asyncio.shield(task), options.timeout)
 
+
+def _sync_wrapper(
+    func: Callable[P, T],
+    key: Hashable,
+    options: _Options,
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> T:
+    val, timestamp = _lookup(key, options.storage)
+    if val is not _MISSING and (options.expire is None or time.time() - timestamp < options.expire):
+        return val
+
+    now = time.time()
     result = func(*args, **kwargs)
-    if storage == "ram":
-        ram_cache[key] = (result, now)
-    elif storage == "disk":
-        disk_cache.set(key, result)
+    _set(key, result, options.storage, now)
     return result
 
 
@@ -146,21 +369,54 @@ def cached(
     *,
     expire: Optional[int] = None,
     storage: Literal["ram", "disk"] = "ram",
+    single_flight: bool = True,
+    timeout: Optional[float] = None,
+    stale_ttl: Optional[int] = None,
+    refresh: Optional[Literal["background"]] = None,
 ) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """
+    Caches the result of `func` by its arguments for `expire` seconds.
+
+    For async functions `single_flight` makes concurrent calls with the same
+    arguments wait for one shared call instead of each calling `func`.
+    Errors are passed to every waiter and are not cached. `timeout` limits
+    how long a caller waits, the shared call itself keeps running.
+
+    Async functions also support:
+    - `stale_ttl`: for this many seconds after expiring the old value is
+      returned at once while one background call refreshes it
+    - `refresh="background"`: every used set of arguments is recomputed in
+      the background shortly before it expires, and forgotten once it is
+      not used for a whole `expire` period
+    """
+    if (stale_ttl or refresh) and expire is None:
+        raise ValueError("stale_ttl and refresh require expire")
+    options = _Options(expire, storage, single_flight, timeout, stale_ttl, refresh)
+
     def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def key_for(args: tuple[Any, ...], kwargs: dict[str, Any]) -> Hashable:
+            if storage == "disk":
+                return make_hash(name, *args, kwargs)  # used as a file name
+            return make_key(name, args, kwargs)
+
         if iscoroutinefunction(func):
 
             @wraps(func)
             async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-                key = make_hash(func.__name__, *args, kwargs)
-                return await _async_wrapper(func, key, expire, storage, *args, **kwargs)
+                key = key_for(args, kwargs)
+                return await _async_wrapper(func, key, options, *args, **kwargs)
 
             return async_wrapper  # type: ignore
 
+        if stale_ttl or refresh:
+            raise ValueError("stale_ttl and refresh are supported only for async functions")
+
         @wraps(func)
         def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            key = make_hash(func.__name__, *args, kwargs)
-            return _sync_wrapper(func, key, expire, storage, *args, **kwargs)
+            key = key_for(args, kwargs)
+            return _sync_wrapper(func, key, options, *args, **kwargs)
 
         return sync_wrapper
 
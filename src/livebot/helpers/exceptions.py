@@ -22,13 +22,23 @@ class QuestNotFound(BotException):
     pass
 
 
-class AchievementNotFoundError(BotException):
+class NotFoundError(BotException):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.name = name
+
+
+class AchievementNotFoundError(NotFoundError):
+    pass
+
+
+class ItemNotFoundError(NotFoundError):
     pass
 
 
-class ItemNotFoundError(BotException):
+class MobNotFoundError(NotFoundError):
     pass
 
 
-class MobNotFoundError(BotException):
+class VersionConflict(BotException):
     pass
@@ -1,7 +1,11 @@
-from typing import Any
+import re
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
 
-from i18n import I18N
+import yaml
 
+from livebot.config import logger
 from livebot.consts import VERSION
 from livebot.data.items.utils import get_item_emoji
 from livebot.helpers.datetime_utils import utcnow
@@ -13,26 +17,233 @@ from livebot.helpers.utils import (
 )
 
 
-i18n = I18N("ru", "src/livebot/locales")
+# same syntax as `i18n.StringFormatter`
+PLACEHOLDER = re.compile(r"\{([^{}]+)\}")
+FUNC_CALL = re.compile(r"(\w+)\((.*)\)")
 
+Template = Callable[[dict[str, Any]], str]
+Placeholder = Callable[[dict[str, Any]], Any]
 
-i18n.register_function("int", int)
-i18n.register_function("get_item_emoji", get_item_emoji)
-i18n.register_function("pretty_float", pretty_float)
-i18n.register_function("pretty_int", pretty_int)
-i18n.register_function("pretty_datetime", pretty_datetime)
-i18n.register_function("utcnow", utcnow)
-i18n.register_function("get_time_difference_string", get_time_difference_string)
 
-i18n.register_constant("CHANNEL_USERNAME", "@LiveBotOfficial")
-i18n.register_constant("CHAT_USERNAME", "@LiveBotOfficialChat")
-i18n.register_constant("GUIDE_URL", "https://0xM4LL0C.github.io/livebot/guide")
-i18n.register_constant("VERSION", str(VERSION))
+def _compile_placeholder(expr: str) -> Placeholder:
+    """
+    Callable that resolves `expr` against the render namespace the same way
+    `i18n.StringFormatter` does, with python expressions compiled once.
+    """
+    if expr.startswith("func:"):
+        body = expr[5:]
+        if not (match := FUNC_CALL.fullmatch(body)):
+            error = f"[Error: Expression '{body}' does not match the expected pattern]"
+            return lambda _: error
+        name = match.group(1)
+        code = compile(body, f"<{expr}>", "eval")
 
+        def call(ns: dict[str, Any]) -> Any:
+            func = ns.get(name)
+            if not func:
+                return f"[Error: func `{name}` is not defined]"
+            if not callable(func):
+                return f"[Error: `{name}` is not callable]"
+            return eval(code, ns)  # pylint: disable=W0123
 
-def t(key: str, **kwargs: Any) -> str:
-    i18n.load()
-    return i18n.t(i18n.default_locale, key, **kwargs)
+        return call
 
+    if expr.startswith("obj:"):
+        body = expr[4:]
+        name = body.split(".")[0]
+        code = compile(body, f"<{expr}>", "eval")
 
-i18n.register_function("t", t)
+        def get_attr(ns: dict[str, Any]) -> Any:
+            if ns.get(name) is None:
+                return f"[Error: object `{name}` is not defined]"
+            return eval(code, ns)  # pylint: disable=W0123
+
+        return get_attr
+
+    if expr.startswith("const:"):
+        name = expr[6:]
+        error = f"[Error: const `{name}` not defined]"
+        return lambda ns: ns.get(name, error)
+
+    error = f"[Error: `{expr}` is not defined]"
+    return lambda ns: ns.get(expr, error)
+
+
+def compile_template(text: str, context: dict[str, Any]) -> Template:
+    parts = PLACEHOLDER.split(text)
+    if len(parts) == 1:
+        return lambda _: text
+
+    literals = parts[0::2]
+    placeholders = [_compile_placeholder(expr) for expr in parts[1::2]]
+    first, rest = literals[0], list(zip(placeholders, literals[1:]))
+
+    def render(kwargs: dict[str, Any]) -> str:
+        ns = {**context, **kwargs}
+        out = [first]
+        for placeholder, literal in rest:
+            out.append(str(placeholder(ns)))
+            out.append(literal)
+        return "".join(out)
+
+    return render
+
+
+def _flatten(data: dict[str, Any], prefix: str = "") -> dict[str, str]:
+    flat: dict[str, str] = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, str):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compile_locale(
+    data: dict[str, Any],
+    context: dict[str, Any],
+) -> tuple[dict[str, Template], dict[str, SyntaxError]]:
+    """
+    Compiled templates of every key and the errors of keys that failed to
+    compile.
+    """
+    templates: dict[str, Template] = {}
+    broken: dict[str, SyntaxError] = {}
+    for key, text in _flatten(data).items():
+        try:
+            templates[key] = compile_template(text, context)
+        except SyntaxError as e:
+            broken[key] = e
+    return templates, broken
+
+
+DEFAULT_LOCALE = "ru"
+LOCALES_DIR = Path("src/livebot/locales")
+
+context: dict[str, Any] = {
+    "int": int,
+    "get_item_emoji": get_item_emoji,
+    "pretty_float": pretty_float,
+    "pretty_int": pretty_int,
+    "pretty_datetime": pretty_datetime,
+    "utcnow": utcnow,
+    "get_time_difference_string": get_time_difference_string,
+    "CHANNEL_USERNAME": "@LiveBotOfficial",
+    "CHAT_USERNAME": "@LiveBotOfficialChat",
+    "GUIDE_URL": "https://0xM4LL0C.github.io/livebot/guide",
+    "VERSION": str(VERSION),
+}
+
+current_locale: ContextVar[Optional[str]] = ContextVar("current_locale", default=None)
+
+available_locales = {path.stem for path in LOCALES_DIR.glob("*.yml")}
+_locales: dict[str, dict[str, Template]] = {}
+# (st_mtime_ns, st_size), mtime alone misses edits within a coarse timestamp tick
+_file_states: dict[str, tuple[int, int]] = {}
+
+Reloaded = tuple[dict[str, Template], dict[str, SyntaxError], tuple[int, int]]
+
+
+def _file_state(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_locale(locale: str) -> Reloaded:
+    path = LOCALES_DIR / f"{locale}.yml"
+    state = _file_state(path)
+    with path.open(encoding="utf-8") as f:
+        templates, broken = compile_locale(yaml.safe_load(f) or {}, context)
+    return templates, broken, state
+
+
+def load_locale(locale: str) -> dict[str, Template]:
+    if not (LOCALES_DIR / f"{locale}.yml").exists():
+        return {}
+    templates, broken, _file_states[locale] = _read_locale(locale)
+    for key, error in broken.items():
+        logger.error(f"locale {locale}: key `{key}` is broken: {error}")
+    return templates
+
+
+def scan_locales(loaded: Iterable[str]) -> tuple[set[str], dict[str, Reloaded]]:
+    """
+    Available locales and the recompiled `loaded` locales whose files
+    changed. Only reads files, so it can run in a worker thread.
+    """
+    available = {path.stem for path in LOCALES_DIR.glob("*.yml")}
+    changed: dict[str, Reloaded] = {}
+    for locale in loaded:
+        if locale not in available:
+            continue
+        try:
+            if _file_state(LOCALES_DIR / f"{locale}.yml") == _file_states.get(locale):
+                continue
+            changed[locale] = _read_locale(locale)
+        except (OSError, yaml.YAMLError) as e:
+            logger.error(f"locale {locale} is not reloaded: {e}")
+    return available, changed
+
+
+def swap_locales(available: set[str], changed: dict[str, Reloaded]) -> None:
+    """
+    Swaps in the result of `scan_locales`. Broken keys keep their previous
+    version, a file that failed to parse keeps the whole previous locale.
+    """
+    available_locales.clear()
+    available_locales.update(available)
+
+    for locale in list(_locales):
+        if locale not in available and locale != DEFAULT_LOCALE:
+            del _locales[locale]
+            _file_states.pop(locale, None)
+
+    for locale, (templates, broken, state) in changed.items():
+        old = _locales.get(locale, {})
+        for key, error in broken.items():
+            logger.error(f"locale {locale}: key `{key}` is broken: {error}")
+            if key in old:
+                templates[key] = old[key]
+        _locales[locale] = templates
+        _file_states[locale] = state
+
+        added, removed = templates.keys() - old.keys(), old.keys() - templates.keys()
+        logger.info(f"locale {locale} reloaded, added: {sorted(added)}, removed: {sorted(removed)}")
+
+
+def loaded_locales() -> list[str]:
+    return list(_locales)
+
+
+def reload_locales() -> None:
+    swap_locales(*scan_locales(loaded_locales()))
+
+
+def get_locale(locale: str) -> dict[str, Template]:
+    """
+    Compiled templates of `locale`, loaded on first use.
+    """
+    templates = _locales.get(locale)
+    if templates is None:
+        templates = _locales[locale] = load_locale(locale)
+    return templates
+
+
+def t(key: str, locale: Optional[str] = None, **kwargs: Any) -> str:
+    """
+    Renders `key` in `locale`, by default the locale of the current update,
+    falling back to `DEFAULT_LOCALE` for keys missing in it.
+    """
+    locale = locale or current_locale.get() or DEFAULT_LOCALE
+    if locale not in available_locales:
+        locale = DEFAULT_LOCALE
+    template = get_locale(locale).get(key)
+    if template is None and locale != DEFAULT_LOCALE:
+        template = get_locale(DEFAULT_LOCALE).get(key)
+    if template is None:
+        return key
+    return template(kwargs)
+
+
+context["t"] = t
+get_locale(DEFAULT_LOCALE)
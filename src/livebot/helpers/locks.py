@@ -0,0 +1,112 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Final, Hashable
+
+from redis.asyncio import Redis
+
+from livebot.config import config
+
+
+@dataclass
+class LockStats:
+    acquired: int = 0
+    contended: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+
+class _Entry:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+class KeyedLock:
+    """
+    One `asyncio.Lock` per key. An entry lives only while somebody holds or
+    waits for it, so memory is bounded by the number of concurrent users.
+    """
+
+    def __init__(self):
+        self.stats = LockStats()
+        self._entries: dict[Hashable, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def locked(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.lock.locked()
+
+    def _record_wait(self, started: float, contended: bool) -> None:
+        wait = time.perf_counter() - started
+        self.stats.acquired += 1
+        self.stats.contended += contended
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+
+    @asynccontextmanager
+    async def _local(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+        entry.refs += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.refs -= 1
+            if not entry.refs:
+                del self._entries[key]
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        started = time.perf_counter()
+        contended = self.locked(key)
+        async with self._local(key):
+            self._record_wait(started, contended)
+            yield
+
+
+class RedisKeyedLock(KeyedLock):
+    """
+    `KeyedLock` that is also held in redis, so several bot processes
+    exclude each other. Waiters of the same process queue on the local lock
+    first and don't poll redis.
+    """
+
+    def __init__(self, url: str, *, prefix: str, timeout: float):
+        super().__init__()
+        self.redis = Redis.from_url(url)
+        self.prefix = prefix
+        self.timeout = timeout
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        started = time.perf_counter()
+        contended = self.locked(key)
+        async with self._local(key):
+            async with self.redis.lock(f"{self.prefix}{key}", timeout=self.timeout):
+                self._record_wait(started, contended)
+                yield
+
+
+def _create_user_lock() -> KeyedLock:
+    if config.redis.locks:
+        return RedisKeyedLock(
+            config.redis.url,
+            prefix="livebot:lock:user:",
+            timeout=config.redis.lock_timeout,
+        )
+    return KeyedLock()
+
+
+user_lock: Final = _create_user_lock()
@@ -265,17 +265,17 @@ class InlineMarkup:
         cls,
         page: int,
         user: UserModel,
+        items: list[MarketItemModel],
     ) -> InlineKeyboardMarkup:
         builder = InlineKeyboardBuilder()
 
-        items = MarketItemModel.get_all()
-        items.sort(key=lambda i: i.published_at, reverse=True)
+        items = sorted(items, key=lambda i: i.published_at, reverse=True)
         try:
-            items = batched(items, MARKET_ITEMS_LIST_MAX_ITEMS_COUNT)[page]
+            page_items = batched(items, MARKET_ITEMS_LIST_MAX_ITEMS_COUNT)[page]
         except IndexError:
-            items = []
+            page_items = []
 
-        for item in items:
+        for item in page_items:
             builder.button(
                 text=(
                     f"{pretty_int(item.quantity)} {get_item_emoji(item.name)} - {pretty_int(item.price)} {COIN_EMOJI}"
@@ -390,13 +390,13 @@ class InlineMarkup:
         return builder.as_markup()
 
     @classmethod
-    def market_my_items(cls, user: UserModel) -> InlineKeyboardMarkup:
+    def market_my_items(
+        cls,
+        user: UserModel,
+        market_items: list[MarketItemModel],
+    ) -> InlineKeyboardMarkup:
         builder = InlineKeyboardBuilder()
 
-        market_items = MarketItemModel.get_all(
-            owner_oid=str(user.oid)
-        )  # Не знаю почему, но работает только если `user.oid` с типом str
-
         logger.debug(str(len(market_items)))
 
         for item in market_items:
@@ -0,0 +1,226 @@
+import asyncio
+import heapq
+import time
+from contextlib import suppress
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from itertools import count
+from typing import TYPE_CHECKING, Optional
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods.base import TelegramType
+
+from livebot.config import logger
+from livebot.config_types import RateLimitConfig
+from livebot.datatypes import ChatIdType
+
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.methods import Response, TelegramMethod
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+
+
+outbound_priority: ContextVar[Priority] = ContextVar(
+    "outbound_priority",
+    default=Priority.INTERACTIVE,
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return max(self.blocked_until - now, (1 - self.tokens) / self.rate, 0.0)
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+@dataclass
+class RateLimitStats:
+    sent: int = 0
+    retry_after_count: int = 0
+    retry_after_seconds: float = 0.0
+    max_queue_size: int = 0
+
+
+Waiter = tuple[Priority, int, ChatIdType, asyncio.Future[None]]
+
+
+class RateLimiter:
+    """
+    Grants sends in priority order while keeping both the global and the
+    per-chat rate limits. A waiter blocked by its chat limit is parked with
+    its chat until the chat may send again, so it doesn't hold back waiters
+    for other chats.
+    """
+
+    MAX_IDLE_BUCKETS = 10_000
+
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self.stats = RateLimitStats()
+        self._global = TokenBucket(config.global_rate, config.global_rate)
+        self._chats: dict[ChatIdType, TokenBucket] = {}
+        self._waiters: list[Waiter] = []
+        self._parked: dict[ChatIdType, list[Waiter]] = {}
+        self._timers: list[tuple[float, ChatIdType]] = []
+        self._counter = count()
+        self._wakeup = asyncio.Event()
+        self._pump_task: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._waiters) + sum(map(len, self._parked.values()))
+
+    def _bucket(self, chat_id: ChatIdType) -> TokenBucket:
+        if (bucket := self._chats.get(chat_id)) is None:
+            if len(self._chats) >= self.MAX_IDLE_BUCKETS:
+                now = time.monotonic()
+                self._chats = {k: v for k, v in self._chats.items() if not v.is_idle(now)}
+
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            rate = self.config.chat_rate if is_private else self.config.group_per_minute / 60
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.config.chat_burst)
+        return bucket
+
+    async def acquire(self, chat_id: ChatIdType, priority: Priority) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), chat_id, future))
+        self.stats.max_queue_size = max(self.stats.max_queue_size, len(self))
+
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        self._wakeup.set()
+        await future
+
+    def backoff(self, chat_id: ChatIdType, seconds: float) -> None:
+        self.stats.retry_after_count += 1
+        self.stats.retry_after_seconds += seconds
+        self._bucket(chat_id).block(time.monotonic(), seconds)
+        logger.warning(
+            f"telegram asked to retry after {seconds}s for chat {chat_id} "
+            f"(total: {self.stats.retry_after_count}, {self.stats.retry_after_seconds}s)"
+        )
+
+    def _unpark(self, now: float) -> None:
+        while self._timers and self._timers[0][0] <= now:
+            _, chat_id = heapq.heappop(self._timers)
+            for waiter in self._parked.pop(chat_id, ()):
+                heapq.heappush(self._waiters, waiter)
+
+    def _park(self, waiter: Waiter, ready_at: float) -> None:
+        chat_id = waiter[2]
+        if (parked := self._parked.get(chat_id)) is None:
+            parked = self._parked[chat_id] = []
+            heapq.heappush(self._timers, (ready_at, chat_id))
+        parked.append(waiter)
+
+    def _grant(self, now: float) -> Optional[float]:
+        """
+        Release the first waiter that may send now. Returns how long to wait
+        before trying again, `0` if a waiter was released and `None` if
+        nobody is waiting.
+        """
+        self._unpark(now)
+        while self._waiters and self._waiters[0][3].done():
+            heapq.heappop(self._waiters)
+
+        if self._waiters and (global_wait := self._global.wait_time(now)):
+            return global_wait
+
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            chat_id, future = waiter[2], waiter[3]
+            if future.done():
+                continue
+            bucket = self._bucket(chat_id)
+            if chat_wait := bucket.wait_time(now):
+                self._park(waiter, now + chat_wait)
+                continue
+
+            bucket.take(now)
+            self._global.take(now)
+            future.set_result(None)
+            return 0.0
+
+        if self._timers:
+            return max(0.0, self._timers[0][0] - now)
+        return None
+
+    async def _pump(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = self._grant(time.monotonic())
+            if delay == 0:
+                continue
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Session middleware for all outgoing requests that target a chat.
+
+    Requests are queued in `RateLimiter` with the priority from
+    `outbound_priority`, at most `concurrency` of them are in flight and
+    `TelegramRetryAfter` pauses the chat and retries the request.
+    """
+
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+        self.limiter = RateLimiter(config)
+        self._senders = asyncio.Semaphore(config.concurrency)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: "TelegramMethod[TelegramType]",
+    ) -> "Response[TelegramType]":
+        chat_id: Optional[ChatIdType] = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        for attempt in range(self.config.max_retries + 1):
+            await self.limiter.acquire(chat_id, outbound_priority.get())
+            async with self._senders:
+                try:
+                    response = await make_request(bot, method)
+                except TelegramRetryAfter as e:
+                    if attempt == self.config.max_retries:
+                        raise
+                    self.limiter.backoff(chat_id, e.retry_after)
+                    continue
+            self.limiter.stats.sent += 1
+            return response
+
+        raise AssertionError("unreachable")
@@ -0,0 +1,69 @@
+import difflib
+from types import MappingProxyType
+from typing import Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+from livebot.helpers.exceptions import NotFoundError
+
+
+T = TypeVar("T")
+
+
+class Registry(Generic[T]):
+    """
+    Frozen index of game objects by every name they can be looked up by:
+    the keys returned by `keys` and their lowercase forms. On collisions the
+    earlier entry wins, the same as a linear scan would.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[T],
+        *,
+        keys: Callable[[T], Iterable[str]],
+        name: Callable[[T], str],
+        error: type[NotFoundError],
+    ):
+        self._entries = tuple(entries)
+        self._name = name
+        self._error = error
+
+        index: dict[str, T] = {}
+        for entry in self._entries:
+            for key in keys(entry):
+                index.setdefault(key, entry)
+        for key, entry in list(index.items()):
+            index.setdefault(key.casefold(), entry)
+        self._index = MappingProxyType(index)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._entries)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.find(name) is not None
+
+    def find(self, name: str) -> Optional[T]:
+        entry = self._index.get(name)
+        if entry is None:
+            entry = self._index.get(name.casefold())
+        return entry
+
+    def get(self, name: str) -> T:
+        entry = self.find(name)
+        if entry is None:
+            raise self._error(name)
+        return entry
+
+    def suggest(self, name: str, n: int = 3, cutoff: float = 0.6) -> list[str]:
+        """
+        Canonical names of the entries closest to a mistyped `name`.
+        """
+        matches = difflib.get_close_matches(name.casefold(), self._index, n=n * 3, cutoff=cutoff)
+        suggestions: list[str] = []
+        for match in matches:
+            canonical = self._name(self._index[match])
+            if canonical not in suggestions:
+                suggestions.append(canonical)
+        return suggestions[:n]
@@ -0,0 +1,91 @@
+import asyncio
+import heapq
+from contextlib import suppress
+from datetime import datetime
+from itertools import count
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+from livebot.config import logger
+from livebot.helpers.datetime_utils import utcnow
+
+
+K = TypeVar("K", bound=Hashable)
+
+COMPACT_THRESHOLD = 64
+
+
+class Scheduler(Generic[K]):
+    """
+    Min-heap of deadlines. Scheduling a key again replaces its previous
+    deadline, `run` sleeps until the nearest one.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int, K]] = []
+        self._entries: dict[K, tuple[int, Any]] = {}
+        self._counter = count()
+        self._wakeup = asyncio.Event()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def schedule(self, key: K, when: datetime, payload: Any = None) -> None:
+        seq = next(self._counter)
+        self._entries[key] = (seq, payload)
+        heapq.heappush(self._heap, (when, seq, key))
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+        self._compact()
+
+    def cancel(self, key: K) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._compact()
+
+    def _compact(self) -> None:
+        # replaced and cancelled deadlines stay in the heap until popped,
+        # drop them once they outnumber the live ones
+        if len(self._heap) > 2 * len(self._entries) + COMPACT_THRESHOLD:
+            self._heap = [entry for entry in self._heap if self._is_current(entry[1], entry[2])]
+            heapq.heapify(self._heap)
+
+    def _is_current(self, seq: int, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] == seq
+
+    def _next_deadline(self) -> Optional[datetime]:
+        while self._heap and not self._is_current(self._heap[0][1], self._heap[0][2]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now: datetime) -> list[tuple[K, Any]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, key = heapq.heappop(self._heap)
+            if self._is_current(seq, key):
+                due.append((key, self._entries.pop(key)[1]))
+        return due
+
+    @staticmethod
+    async def _call(callback: Callable[[K, Any], Awaitable[Any]], key: K, payload: Any) -> None:
+        try:
+            await callback(key, payload)
+        except Exception as e:  # pylint: disable=W0718
+            logger.error(f"scheduled callback for {key} failed: {e}")
+
+    async def run(self, callback: Callable[[K, Any], Awaitable[Any]]) -> None:
+        """
+        Calls `callback` for every due key, each in its own task, so a burst of
+        deadlines is not processed one by one.
+        """
+        while True:
+            for key, payload in self._pop_due(utcnow()):
+                task = asyncio.create_task(self._call(callback, key, payload))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            self._wakeup.clear()
+            deadline = self._next_deadline()
+            timeout = None if deadline is None else max(0.0, (deadline - utcnow()).total_seconds())
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
@@ -1,11 +1,9 @@
-import asyncio
 import itertools
 from datetime import datetime, timedelta
 from statistics import median
-from typing import Any, Awaitable, Callable, Iterable, ParamSpec, Self, Sequence, TypeVar
+from typing import Any, Callable, Iterable, ParamSpec, Self, Sequence, TypeVar
 
 import aiohttp
-from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import InlineKeyboardMarkup, Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from annotated_types import SupportsLt
@@ -30,14 +28,12 @@ def remove_not_allowed_symbols(text: str) -> str:
     return cleaned_text.strip()
 
 
-@cached()
 def calc_percentage(part: int, total: int = 100) -> float:
     if total == 0:
         raise ValueError("Общий объем не может быть равен нулю")
     return (part / total) * 100
 
 
-@cached()
 def create_progress_bar(percentage: float) -> str:
     percentage = max(0, min(percentage, 100))
 
@@ -66,16 +62,6 @@ def quick_markup(
     return builder.as_markup()
 
 
-async def antiflood(func: Awaitable[T]) -> T:
-    number_retries = 5
-    for _ in range(number_retries):
-        try:
-            return await func
-        except TelegramRetryAfter as e:
-            await asyncio.sleep(e.retry_after)
-    return await func
-
-
 @cached()
 def batched(iterable: Iterable[T], n: int) -> list[tuple[T, ...]]:
     # https://docs.python.org/3.12/library/itertools.html#itertools.batched
@@ -93,7 +79,6 @@ def pretty_datetime(d: datetime) -> str:
     return d.strftime("%H:%M %d.%m.%Y")
 
 
-@cached()
 def get_time_difference_string(d: timedelta) -> str:
     years, days_in_year = divmod(d.days, 365)
     months, days = divmod(days_in_year, 30)
@@ -131,7 +116,7 @@ class MessageEditor:
         self.exit_funcs: set[Callable[[], None | Any]] = set()
 
     async def __aenter__(self) -> Self:
-        self.message = await antiflood(self.user_message.reply(self._mess))
+        self.message = await self.user_message.reply(self._mess)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -140,31 +125,27 @@ class MessageEditor:
 
     async def write(self, new_text: str):
         self._mess = text = f"{self._mess}\n<b>*</b>  {new_text}"
-        self.message = await antiflood(self.message.edit_text(text))  # type: ignore
+        self.message = await self.message.edit_text(text)  # type: ignore
 
 
-@cached()
 def pretty_float(num: float) -> str:
     return f"{num:.1f}"
 
 
-@cached()
 def pretty_int(num: int) -> str:
     return f"{num:,}".replace(",", " ")
 
 
-@cached()
 def sorted_dict(d: dict[K, V], /, *, reverse: bool = False) -> dict[K, V]:
     return dict(sorted(d.items(), key=lambda item: item[1], reverse=reverse))
 
 
-@cached()
 def remove_extra_keys(dict1: dict[str, Any], dict2: dict[K, V]) -> dict[K, V]:
     return {key: dict2[key] for key in dict2 if key in dict1}
 
 
-@cached(expire=(15 * MINUTE), storage="disk")
-def get_item_middle_price(name: str) -> int:
+@cached(expire=(15 * MINUTE), storage="disk", stale_ttl=15 * MINUTE)
+async def get_item_middle_price(name: str) -> int:
     from livebot.data.items.utils import get_item
     from livebot.database.models import MarketItemModel
 
@@ -172,7 +153,7 @@ def get_item_middle_price(name: str) -> int:
 
     prices: list[int] = []
 
-    market_items = MarketItemModel.get_all(name=name)
+    market_items = await MarketItemModel.get_all_async(name=name)
     for market_item in market_items:
         prices.append(round(market_item.quantity / market_item.price))
 
@@ -185,7 +166,7 @@ def get_item_middle_price(name: str) -> int:
     return round(median(prices))
 
 
-@cached(expire=(MINUTE * 15), storage="disk")
+@cached(expire=(MINUTE * 15), storage="disk", stale_ttl=MINUTE * 45)
 async def check_version() -> str:
     url = f"https://api.github.com/repos/{AUTHOR}/{APP_NAME}/releases/latest"
 
@@ -211,7 +192,6 @@ async def check_version() -> str:
             return "?"
 
 
-@cached(storage="disk")
 def parse_time_duration(time_str: str) -> timedelta:
     """
     Parse time duration in the format like 2d, 3h, 15m and return the timedelta.
@@ -230,7 +210,6 @@ def parse_time_duration(time_str: str) -> timedelta:
     raise ValueError(f"Invalid time unit. Excepted on of {{m,h,d}}, got `{unit}`")
 
 
-@cached(storage="disk")
 def is_win_in_slot_machine(value: int) -> bool:
     a, b, c = SLOT_MACHINE_VALUE[value]
 
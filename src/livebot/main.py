@@ -1,6 +1,7 @@
 from livebot.cli import ARGS  # isort: skip # pylint: disable=C0412
 import asyncio
 from argparse import Namespace
+from contextlib import suppress
 
 from aiogram import Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
@@ -8,10 +9,12 @@ from aiogram.types import BotCommand
 
 from livebot.config import bot, config, logger
 from livebot.consts import APP_NAME, CACHE_DIR, CONFIG_DIR, DATA_DIR, VERSION
-from livebot.database.models import UserModel
+from livebot.database.base import get_index_drift, sync_indexes
+from livebot.database.models import UserAdminView, UserModel
 from livebot.handlers import router
 from livebot.helpers.exceptions import NoResult
-from livebot.middlewares import middlewares
+from livebot.helpers.rate_limiter import RateLimitMiddleware
+from livebot.middlewares import callback_middlewares, middlewares
 from livebot.tasks import run_tasks
 
 
@@ -26,6 +29,8 @@ def init_middlewares():
     logger.debug("initializing middlewares")
     for middleware in middlewares:
         dp.message.middleware(middleware())
+    for middleware in callback_middlewares:
+        dp.callback_query.middleware(middleware())
 
 
 async def init_bot_commands():
@@ -52,13 +57,21 @@ async def init_bot_commands():
 
 async def init_bot_admins():
     for uid in config.general.owners:
-        try:
-            user = await UserModel.get_async(id=uid)
-        except NoResult:
-            continue
+        with suppress(NoResult):
+            await UserModel.apply_async(id=uid, set={"is_admin": True}, projection=UserAdminView)
+
 
-        user.is_admin = True
-        await user.update_async()
+async def check_indexes():
+    for collection_name, drift in (await get_index_drift()).items():
+        if drift.is_empty:
+            logger.info(f"{collection_name}: ok")
+            continue
+        for name in drift.missing:
+            logger.warning(f"{collection_name}: missing index `{name}`")
+        for name in drift.changed:
+            logger.warning(f"{collection_name}: changed index `{name}`")
+        for name in drift.extra:
+            logger.warning(f"{collection_name}: undeclared index `{name}`")
 
 
 async def main(args: Namespace) -> None:
@@ -74,9 +87,15 @@ async def main(args: Namespace) -> None:
     for handler in logger.handlers:
         handler.level = logger.level
 
+    if args.check_indexes:
+        await check_indexes()
+        return
+
+    await sync_indexes()
     await init_bot_admins()
     await init_bot_commands()
     init_middlewares()
+    bot.session.middleware(RateLimitMiddleware(config.telegram.rate_limit))
 
     if not args.without_tasks:
         run_tasks()
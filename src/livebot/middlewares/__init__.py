@@ -3,14 +3,23 @@ from typing import Type
 from aiogram import BaseMiddleware
 
 from livebot.middlewares.actives import ActiveMiddleware
+from livebot.middlewares.locale import LocaleMiddleware
 from livebot.middlewares.register import RegisterMiddleware
 from livebot.middlewares.rule_check import RuleCheckMiddleware
+from livebot.middlewares.unit_of_work import UnitOfWorkMiddleware
 
 
 middlewares: list[Type[BaseMiddleware]] = [
+    UnitOfWorkMiddleware,
     RegisterMiddleware,
+    LocaleMiddleware,
     RuleCheckMiddleware,
     ActiveMiddleware,
 ]
 
-__all__ = ["middlewares"]
+callback_middlewares: list[Type[BaseMiddleware]] = [
+    UnitOfWorkMiddleware,
+    LocaleMiddleware,
+]
+
+__all__ = ["callback_middlewares", "middlewares"]
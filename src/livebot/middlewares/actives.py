@@ -19,20 +19,17 @@ class ActiveMiddleware(BaseMiddleware):
             if event.from_user.id == TELEGRAM_ID or event.from_user.is_bot:
                 return
 
-            user_id = event.from_user.id
-            user = await UserModel.get_async(id=user_id)
+            user = await UserModel.get_async(id=event.from_user.id)
 
-            if any(violation for violation in user.violations if violation.type == "permanent-ban"):
+            if any(v for v in user.violations if v.type == "permanent-ban"):
                 # TODO: add message
                 return
 
             result = await handler(event, data)
-            await user.fetch_async()
 
             if (utcnow() - user.last_active_time).days >= 1:
                 user.achievements_info.incr_progress("новичок")
                 user.achievements_info.incr_progress("олд")
-
             user.last_active_time = utcnow()
             await user.update_async()
 
@@ -0,0 +1,31 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from livebot.database.models import UserModel
+from livebot.helpers.exceptions import NoResult
+from livebot.helpers.localization import current_locale
+
+
+class LocaleMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ):
+        from_user: User | None = data.get("event_from_user")
+        if from_user is None:
+            return await handler(event, data)
+
+        try:
+            user = await UserModel.get_async(id=from_user.id)
+        except NoResult:
+            return await handler(event, data)
+
+        token = current_locale.set(user.lang)
+        try:
+            return await handler(event, data)
+        finally:
+            current_locale.reset(token)
@@ -1,4 +1,3 @@
-import asyncio
 from typing import Any, Awaitable, Callable
 
 from aiogram import BaseMiddleware
@@ -7,9 +6,9 @@ from aiogram.types import Message, TelegramObject
 from livebot.config import logger
 from livebot.consts import TELEGRAM_ID
 from livebot.database.models import UserModel
-from livebot.helpers.cache import ram_cache
 from livebot.helpers.exceptions import NoResult
 from livebot.helpers.utils import remove_not_allowed_symbols
+from livebot.tasks.notification import schedule_daily_gift
 
 
 async def register_user(message: Message) -> UserModel:
@@ -21,6 +20,7 @@ async def register_user(message: Message) -> UserModel:
             name=remove_not_allowed_symbols(message.from_user.full_name),
         )
         await user.add_async()
+        schedule_daily_gift(user)
         logger.info(f"Новый пользователь: {user.name} ({user.id})")
 
         return user
@@ -45,10 +45,4 @@ class RegisterMiddleware(BaseMiddleware):
 
         if not hasattr(event, "from_user"):
             return
-        ev = asyncio.Event()
-        ram_cache[f"lock-{event.from_user.id}"] = (ev, 0.0)  # type: ignore
-        try:
-            ev.set()
-            return await handler(event, data)
-        finally:
-            ev.clear()
+        return await handler(event, data)
@@ -4,7 +4,7 @@ from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery, Message, TelegramObject
 
 from livebot.consts import TELEGRAM_ID
-from livebot.database.models import UserModel
+from livebot.database.models import UserModel, UserRulesView
 from livebot.helpers.callback_factory import RulesCallback
 from livebot.helpers.utils import quick_markup
 
@@ -35,9 +35,9 @@ class RuleCheckMiddleware(BaseMiddleware):
         if event.from_user.id == TELEGRAM_ID or event.from_user.is_bot:
             return
 
-        user = await UserModel.get_async(id=event.from_user.id)
+        rules = await UserModel.get_async(id=event.from_user.id, projection=UserRulesView)
 
-        if user.accepted_rules:
+        if rules.accepted_rules:
             return await handler(event, data)
 
         message: Message
@@ -48,4 +48,5 @@ class RuleCheckMiddleware(BaseMiddleware):
         else:
             return
 
+        user = await UserModel.get_async(id=event.from_user.id)
         await send_rules_message(message, user)
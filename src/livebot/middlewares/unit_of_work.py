@@ -0,0 +1,30 @@
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+
+from livebot.database.unit_of_work import UnitOfWork
+from livebot.helpers.locks import user_lock
+
+
+class UnitOfWorkMiddleware(BaseMiddleware):
+    """
+    Holds the lock of the user who sent the update from before anything is
+    loaded until the unit of work is flushed, so overlapping updates of one
+    user never run on stale state.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ):
+        async with AsyncExitStack() as stack:
+            from_user: User | None = data.get("event_from_user")
+            if from_user is not None:
+                await stack.enter_async_context(user_lock(from_user.id))
+            async with UnitOfWork() as uow:
+                data["uow"] = uow
+                return await handler(event, data)
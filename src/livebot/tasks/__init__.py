@@ -1,6 +1,7 @@
 import asyncio
 
 from livebot.tasks.check import check
+from livebot.tasks.locales import watch_locales
 from livebot.tasks.notification import notification
 
 
@@ -8,6 +9,7 @@ async def setup_tasks():
     tasks = [
         check(),
         notification(),
+        watch_locales(),
     ]
 
     await asyncio.gather(*tasks)
@@ -2,49 +2,168 @@
 
 import asyncio
 import random
-from datetime import timedelta
-from itertools import filterfalse
+from datetime import datetime
+from typing import Any, Optional
 
-from livebot.database.models import UserModel
-from livebot.helpers.cache import ram_cache
+from bson import ObjectId
+
+from livebot.config import config, logger
+from livebot.data.achievements.achievements import ACHIEVEMENTS
+from livebot.database.models import DECAY_STATS, STATS_DECAY_PERIOD, UserIdView, UserModel
 from livebot.helpers.datetime_utils import utcnow
+from livebot.helpers.exceptions import NoResult, VersionConflict
+from livebot.helpers.locks import user_lock
+from livebot.helpers.rate_limiter import Priority, outbound_priority
 
 
-async def _check():
-    users = await UserModel.get_all_async()
+CHECK_INTERVAL = STATS_DECAY_PERIOD
+BATCH_SIZE = 500
+
+_last_follow_up: Optional[datetime] = None
+
+
+def _needs_follow_up() -> dict[str, Any]:
+    pending_achievements = [
+        {
+            f"achievements_info.progress.{achievement.key}": {"$gte": achievement.need},
+            "achievements_info.achievements.name": {"$ne": achievement.name},
+        }
+        for achievement in ACHIEVEMENTS
+    ]
+    return {"$or": [{"$expr": {"$gte": ["$xp", "$max_xp"]}}, *pending_achievements]}
+
+
+async def _decay(oids: list[ObjectId]):
+    now = utcnow()
+    decayed: dict[str, list[ObjectId]] = {stat: [] for stat in DECAY_STATS}
+
+    for oid in oids:
+        choice = random.randint(0, 5)
+        if choice < len(DECAY_STATS):
+            decayed[DECAY_STATS[choice]].append(oid)
+
+    for stat, stat_oids in decayed.items():
+        if stat_oids:
+            await UserModel.apply_many_async(
+                _id={"$in": stat_oids},
+                inc={stat: -1},
+                **{stat: {"$gt": 0}},
+            )
+
+    await UserModel.apply_many_async(
+        _id={"$in": oids},
+        set={"last_checked_at": now},
+        pull={"violations": {"until_date": {"$lt": now}}},
+    )
+
+    await _follow_up(_id={"$in": oids})
 
-    for user in users:
-        if cached_value := ram_cache.get(f"lock-{user.id}"):
-            ev, _ = cached_value
-            ev: asyncio.Event
-            if ev.is_set():
+
+async def _follow_up(**options):
+    query = {**options, **_needs_follow_up()}
+    async for view in UserModel.iter_async(projection=UserIdView, **query):
+        # the user is loaded under the lock, so no handler changes it meanwhile
+        async with user_lock(view.id):
+            try:
+                user = await UserModel.get_async(oid=view.oid)
+            except NoResult:
                 continue
+            await user.check_status()
+            try:
+                await user.flush_async(merge=True)
+            except VersionConflict:
+                logger.warning(f"follow-up of user {user.id} skipped: version conflict")
 
-        if (user.last_checked_at - utcnow()) < timedelta(hours=1):
-            continue
-        await user.fetch_async()
-        user.last_checked_at = utcnow()
 
-        match random.randint(0, 5):
-            case 0:
-                user.hunger -= 1
-            case 1:
-                user.fatigue -= 1
-            case 2:
-                user.mood -= 1
+def _decay_pipeline(now: datetime) -> list[dict[str, Any]]:
+    now_iso = now.isoformat()
+    return [
+        {"$set": {"_decay": {"$floor": {"$multiply": [{"$rand": {}}, 6]}}}},
+        {
+            "$set": {
+                stat: {
+                    "$max": [
+                        0,
+                        {
+                            "$min": [
+                                100,
+                                {
+                                    "$subtract": [
+                                        f"${stat}",
+                                        {"$cond": [{"$eq": ["$_decay", i]}, 1, 0]},
+                                    ]
+                                },
+                            ]
+                        },
+                    ]
+                }
+                for i, stat in enumerate(DECAY_STATS)
+            }
+        },
+        {
+            "$set": {
+                "last_checked_at": now_iso,
+                "violations": {
+                    "$filter": {
+                        "input": {"$ifNull": ["$violations", []]},
+                        "cond": {"$gte": [{"$ifNull": ["$$this.until_date", now_iso]}, now_iso]},
+                    }
+                },
+            }
+        },
+        {"$unset": "_decay"},
+    ]
+
+
+async def _check_pipeline():
+    now = utcnow()
+    await UserModel.apply_pipeline_many_async(
+        _decay_pipeline(now),
+        last_checked_at={"$lt": (now - CHECK_INTERVAL).isoformat()},
+    )
+    await _follow_up(last_checked_at=now.isoformat())
+
+
+async def _check_lazy():
+    # stats are decayed on load, so only expired violations are cleaned up
+    # here and level-ups and achievements are swept once per check interval
+    global _last_follow_up  # pylint: disable=W0603
+    now = utcnow()
+    expired: dict[str, Any] = {"violations.until_date": {"$lt": now.isoformat()}}
+    await UserModel.apply_many_async(pull={"violations": {"until_date": {"$lt": now}}}, **expired)
+
+    if _last_follow_up is None or now - _last_follow_up >= CHECK_INTERVAL:
+        _last_follow_up = now
+        await _follow_up()
+
+
+async def _check():
+    if config.general.stats_decay == "pipeline":
+        await _check_pipeline()
+        return
+    if config.general.stats_decay == "lazy":
+        await _check_lazy()
+        return
+
+    cutoff = utcnow() - CHECK_INTERVAL
+    oids: list[ObjectId] = []
 
-        user.violations = list(
-            filterfalse(
-                lambda v: v.until_date and v.until_date < utcnow(),
-                user.violations,
-            ),
-        )
+    async for user in UserModel.iter_async(
+        batch_size=BATCH_SIZE,
+        projection=UserIdView,
+        last_checked_at={"$lt": cutoff.isoformat()},
+    ):
+        oids.append(user.oid)
+        if len(oids) >= BATCH_SIZE:
+            await _decay(oids)
+            oids = []
 
-        await user.check_status()
-        await user.update_async()
+    if oids:
+        await _decay(oids)
 
 
 async def check():
+    outbound_priority.set(Priority.NOTIFICATION)
     event = asyncio.Event()
     while True:
         if event.is_set():
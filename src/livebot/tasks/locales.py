@@ -0,0 +1,14 @@
+import asyncio
+
+from livebot.helpers.localization import loaded_locales, scan_locales, swap_locales
+
+
+RELOAD_INTERVAL = 5
+
+
+async def watch_locales():
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        # files are parsed in a thread, the swap happens on the loop
+        available, changed = await asyncio.to_thread(scan_locales, loaded_locales())
+        swap_locales(available, changed)
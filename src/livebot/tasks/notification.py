@@ -1,79 +1,92 @@
-# pylint: disable=R0801
-
-import asyncio
 from contextlib import suppress
+from datetime import timedelta
+from typing import Any, Optional
 
 from aiogram.exceptions import TelegramAPIError
+from bson import ObjectId
 
 from livebot.config import bot
-from livebot.database.models import UserModel
-from livebot.helpers.cache import ram_cache
+from livebot.database.models import UserModel, UserScheduleView
 from livebot.helpers.datetime_utils import utcnow
+from livebot.helpers.exceptions import NoResult
 from livebot.helpers.localization import t
-from livebot.helpers.utils import antiflood
-
-
-async def _notification():
-    users = await UserModel.get_all_async()
-
-    for user in users:
-        if cached_value := ram_cache.get(f"lock-{user.id}"):
-            ev, _ = cached_value
-            ev: asyncio.Event
-            if ev.is_set():
-                continue
-
-        await user.fetch_async()
-
-        messages: set[str] = set()
-
-        if user.action and user.action.is_done:
-            if user.action.type == "walk" and not user.notification_status.walk:
-                user.notification_status.walk = True
-                messages.add(t(f"notifications.end-{user.action.type}"))
-            elif user.action.type == "work" and not user.notification_status.work:
-                user.notification_status.work = True
-                messages.add(t(f"notifications.end-{user.action.type}"))
-            elif user.action.type == "sleep" and not user.notification_status.sleep:
-                user.notification_status.sleep = True
-                messages.add(t(f"notifications.end-{user.action.type}"))
-            elif user.action.type == "game" and not user.notification_status.game:
-                user.notification_status.game = True
-                messages.add(t(f"notifications.end-{user.action.type}"))
-            elif user.action.type == "fishing" and not user.notification_status.fishing:
-                user.notification_status.fishing = True
-                messages.add(t(f"notifications.end-{user.action.type}"))
-        if user.health < 30:
-            ...
-        if user.fatigue < 30:
-            ...
-        if user.hunger < 30:
-            ...
-        if user.mood < 30:
-            ...
-        if (
-            user.daily_gift.next_claim_available_at <= utcnow()
-            and not user.notification_status.daily_gift
-        ):
-            user.notification_status.daily_gift = True
-            messages.add(t("notifications.daily-gift-available"))
-
-        with suppress(TelegramAPIError):
-            for message in messages:
-                await antiflood(bot.send_message(user.id, message))
-
-        await user.update_async()
+from livebot.helpers.rate_limiter import Priority, outbound_priority
+from livebot.helpers.scheduler import Scheduler
+
+
+DAILY_GIFT_INTERVAL = timedelta(days=1)
+
+scheduler: Scheduler[tuple[str, ObjectId]] = Scheduler()
+
+
+def schedule_action(user: UserModel | UserScheduleView):
+    if user.action is None:
+        scheduler.cancel(("action", user.oid))
+        return
+    scheduler.schedule(("action", user.oid), user.action.end, user.action.type)
+
+
+def schedule_daily_gift(user: UserModel | UserScheduleView):
+    # players who never claimed the gift are reminded a day after registration
+    since = user.daily_gift.last_claimed_at or user.registered_at
+    scheduler.schedule(("daily-gift", user.oid), since + DAILY_GIFT_INTERVAL)
+
+
+async def _notify(oid: ObjectId, guard: dict[str, Any], status: str, key: str):
+    # the guard makes the flag flip atomic, so a notification is sent at most once
+    try:
+        user = await UserModel.apply_async(
+            oid=oid,
+            guard={**guard, f"notification_status.{status}": {"$ne": True}},
+            set={f"notification_status.{status}": True},
+            projection=UserScheduleView,
+        )
+    except NoResult:
+        return
+
+    with suppress(TelegramAPIError):
+        await bot.send_message(user.id, t(key, locale=user.lang))
+
+
+async def _on_due(key: tuple[str, ObjectId], payload: Optional[str]):
+    kind, oid = key
+    now = utcnow()
+
+    if kind == "action" and payload:
+        await _notify(
+            oid,
+            {"action.type": payload, "action.end": {"$lte": now.isoformat()}},
+            payload,
+            f"notifications.end-{payload}",
+        )
+    elif kind == "daily-gift":
+        claimable: dict[str, Any] = {
+            "$or": [
+                {"daily_gift.last_claimed_at": None},
+                {"daily_gift.last_claimed_at": {"$lte": (now - DAILY_GIFT_INTERVAL).isoformat()}},
+            ],
+        }
+        await _notify(
+            oid,
+            claimable,
+            "daily_gift",
+            "notifications.daily-gift-available",
+        )
+
+
+async def _rebuild():
+    actions_query: dict[str, Any] = {"action.end": {"$exists": True}}
+    async for user in UserModel.iter_async(projection=UserScheduleView, **actions_query):
+        assert user.action  # for linters
+        if not getattr(user.notification_status, user.action.type):
+            schedule_action(user)
+
+    daily_gifts_query: dict[str, Any] = {"notification_status.daily_gift": {"$ne": True}}
+    async for user in UserModel.iter_async(projection=UserScheduleView, **daily_gifts_query):
+        schedule_daily_gift(user)
 
 
 async def notification():
-    event = asyncio.Event()
-    while True:
-        if event.is_set():
-            continue
-
-        try:
-            event.set()
-            await _notification()
-        finally:
-            event.clear()
-        await asyncio.sleep(15)
+    outbound_priority.set(Priority.NOTIFICATION)
+    await _rebuild()
+    await scheduler.run(_on_due)
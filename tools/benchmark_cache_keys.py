@@ -0,0 +1,58 @@
+import sys
+import timeit
+
+
+sys.path.insert(0, "src")
+
+from datetime import datetime, timedelta
+
+from livebot.helpers.cache import make_hash, make_key
+from livebot.helpers.utils import (
+    get_time_difference_string,
+    pretty_datetime,
+    pretty_int,
+    remove_not_allowed_symbols,
+)
+
+
+NUMBER = 50_000
+REPEAT = 5
+
+CASES = [
+    ("pretty_int", (1234567,), {}),
+    ("calc_percentage", (30, 120), {}),
+    ("get_item_emoji", ("бабло",), {}),
+    ("sorted_dict", ({"a": 2, "b": 1},), {"reverse": True}),
+    ("check_version", (), {}),
+]
+
+
+def bench(func) -> float:
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e9
+
+
+def main():
+    print(f"{'key':<20} {'make_hash':>12} {'make_key':>12} {'speedup':>8}")
+    for name, args, kwargs in CASES:
+        old = bench(lambda name=name, args=args, kwargs=kwargs: make_hash(name, *args, kwargs))
+        new = bench(lambda name=name, args=args, kwargs=kwargs: make_key(name, args, kwargs))
+        print(f"{name:<20} {old:9.0f} ns {new:9.0f} ns {old / new:7.1f}x")
+
+    now = datetime(2025, 1, 1)
+    print(f"\n{'cached call':<28} {'ns/call':>12}")
+    for name, func in [
+        ("remove_not_allowed_symbols", lambda: remove_not_allowed_symbols("<b>name</b>")),
+        ("pretty_datetime", lambda: pretty_datetime(now)),
+    ]:
+        print(f"{name:<28} {bench(func):9.0f} ns")
+
+    print(f"\n{'not cached':<28} {'ns/call':>12}")
+    for name, func in [
+        ("pretty_int", lambda: pretty_int(1234567)),
+        ("get_time_difference_string", lambda: get_time_difference_string(timedelta(hours=5))),
+    ]:
+        print(f"{name:<28} {bench(func):9.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
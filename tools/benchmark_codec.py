@@ -0,0 +1,53 @@
+import sys
+import timeit
+
+import bson
+from bson.raw_bson import RawBSONDocument
+
+
+sys.path.insert(0, "src")
+
+from livebot.data.items.items import ITEMS
+from livebot.database.codec import decode
+from livebot.database.models import UserModel
+
+
+USERS_COUNT = 1000
+REPEAT = 5
+
+
+def make_documents() -> list[dict]:
+    documents = []
+    for i in range(USERS_COUNT):
+        user = UserModel(id=i, name=f"user{i}")
+        for item in ITEMS[:40]:
+            user.inventory.add(item.name, 3)
+        user.achievements_info.progress = {"новичок": i % 10}
+        documents.append(user.to_dict())
+    return documents
+
+
+def bench(name: str, func, documents) -> float:
+    best = min(timeit.repeat(lambda: [func(doc) for doc in documents], number=1, repeat=REPEAT))
+    print(f"{name:<40} {best * 1000:8.1f} ms  ({best / len(documents) * 1e6:6.1f} us/doc)")
+    return best
+
+
+def main():
+    documents = make_documents()
+    raw_documents = [RawBSONDocument(bson.encode(doc)) for doc in documents]
+
+    baseline = bench("from_dict", UserModel.from_dict, documents)
+    codec = bench("codec", lambda doc: decode(UserModel, doc), documents)
+    bench(
+        "codec + inventory access",
+        lambda doc: decode(UserModel, doc).inventory.items,
+        documents,
+    )
+    bench("codec (RawBSONDocument)", lambda doc: decode(UserModel, doc), raw_documents)
+
+    print(f"\nspeedup: {baseline / codec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+import timeit
+
+from i18n import I18N
+
+
+sys.path.insert(0, "src")
+
+from livebot.database.models import UserModel
+from livebot.helpers.localization import DEFAULT_LOCALE, LOCALES_DIR, context, t
+
+
+# the old path parses the locale file on every call, so it gets fewer runs
+OLD_NUMBER = 20
+NUMBER = 20_000
+REPEAT = 5
+
+
+def bench(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=REPEAT)) / number * 1e6
+
+
+def main():
+    user = UserModel(id=1, name="user")
+    i18n = I18N(DEFAULT_LOCALE, str(LOCALES_DIR))
+    i18n.context.update(context)
+    cases = [
+        ("rules", {}),
+        ("welcome", {"name": "user"}),
+        ("item-not-enough", {"item_name": "бабло"}),
+        ("profile", {"user": user}),
+    ]
+
+    print(f"{'key':<20} {'load + t':>12} {'compiled':>12} {'speedup':>8}")
+    for key, kwargs in cases:
+
+        def old(key=key, kwargs=kwargs):
+            i18n.load()
+            return i18n.t(i18n.default_locale, key, **kwargs)
+
+        def new(key=key, kwargs=kwargs):
+            return t(key, **kwargs)
+
+        assert old() == new(), key
+        old_time, new_time = bench(old, OLD_NUMBER), bench(new, NUMBER)
+        print(f"{key:<20} {old_time:9.1f} us {new_time:9.1f} us {old_time / new_time:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()